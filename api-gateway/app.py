@@ -3,22 +3,571 @@ import os
 import time
 import json
 import uuid
+import contextvars
+import hashlib
+import heapq
 from datetime import datetime, timedelta
-from threading import Thread, Lock
-from typing import Dict, Any, Optional
-from flask import Flask, request, jsonify
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from queue import Queue, Empty, Full
+from threading import Thread, Lock, Event, Condition
+from typing import Dict, Any, Optional, List
+from flask import Flask, Response, request, jsonify, has_request_context, copy_current_request_context
 from flask_cors import CORS
 import pika
 import redis
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import EmptyPoolError
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from shared.instrumentation import instrument_app, metrics
+from shared import tracing
+from shared.tenant_context import TENANT_CONTEXT_HEADER, TenantCache, sign_tenant_context
+from shared.tenant_events import start_tenant_event_consumer
+from shared.rabbitmq import connect_rabbitmq
+from shared.pagination import NEXT_CURSOR_HEADER, next_cursor, page_limit
+from shared.http import SUBREQUEST_ENVIRON_KEY, enable_conditional_responses
+
+class UpstreamInstance:
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip('/')
+        self.healthy = True
+        self.outstanding = 0
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.last_checked = None
+
+class PoolTimeoutMixin:
+    pool_timeout = None
+
+    def _get_conn(self, timeout=None):
+        return super()._get_conn(timeout if timeout is not None else self.pool_timeout)
+
+class BoundedHTTPAdapter(HTTPAdapter):
+    def __init__(self, pool_timeout: float, **kwargs):
+        self.pool_timeout = pool_timeout
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: type(pool_class.__name__, (PoolTimeoutMixin, pool_class), {'pool_timeout': self.pool_timeout})
+            for scheme, pool_class in self.poolmanager.pool_classes_by_scheme.items()
+        }
+
+class UpstreamPoolExhausted(Exception):
+    pass
+
+class UpstreamClient:
+    def __init__(self, name: str, base_urls, pool_size: int = 10,
+                 connect_timeout: float = 2.0, read_timeout: float = 10.0,
+                 health_path: str = '/health', max_failures: int = 3, pool_timeout: float = 2.0):
+        if isinstance(base_urls, str):
+            base_urls = base_urls.split(',')
+        self.name = name
+        self.instances = [UpstreamInstance(url.strip()) for url in base_urls]
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.health_path = health_path
+        self.max_failures = max_failures
+        self.pool_timeout = pool_timeout
+        self.adapter = BoundedHTTPAdapter(pool_timeout, pool_connections=len(self.instances),
+                                          pool_maxsize=pool_size, pool_block=True)
+        self.session = requests.Session()
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+        self.latency = metrics.histogram('gateway_upstream_request_duration_seconds', {'upstream': name})
+        self.errors = 0
+        self.pool_timeouts = 0
+        self.next_index = 0
+        self.lock = Lock()
+        for instance in self.instances:
+            metrics.register_gauge('gateway_upstream_outstanding_requests', lambda i=instance: i.outstanding,
+                                   {'upstream': name, 'instance': instance.base_url})
+            metrics.register_gauge('gateway_upstream_healthy', lambda i=instance: int(i.healthy),
+                                   {'upstream': name, 'instance': instance.base_url})
+
+    @property
+    def base_url(self) -> str:
+        return self.instances[0].base_url
+
+    def acquire(self, exclude=()) -> UpstreamInstance:
+        with self.lock:
+            candidates = [i for i in self.instances if i.healthy and i not in exclude] \
+                or [i for i in self.instances if i not in exclude] or self.instances
+            count = len(candidates)
+            start = self.next_index % count
+            self.next_index += 1
+            instance = min((candidates[(start + offset) % count] for offset in range(count)),
+                           key=lambda i: i.outstanding)
+            instance.outstanding += 1
+            instance.requests += 1
+            return instance
+
+    def release(self, instance: UpstreamInstance, failed: bool):
+        with self.lock:
+            instance.outstanding -= 1
+            if failed:
+                instance.errors += 1
+                self.errors += 1
+                instance.consecutive_failures += 1
+                if instance.consecutive_failures >= self.max_failures and instance.healthy:
+                    instance.healthy = False
+                    print(f"Upstream {self.name} instance {instance.base_url} marked unhealthy")
+            else:
+                instance.consecutive_failures = 0
+
+    def get(self, path: str, params: Optional[Dict[str, Any]] = None,
+            headers: Optional[Dict[str, str]] = None, stream: bool = False) -> requests.Response:
+        start_time = time.perf_counter()
+        tried = []
+        with tracing.span(f'upstream GET {self.name}', path=path) as span_id:
+            headers = dict(headers or {}, **tracing.trace_headers(span_id))
+            while True:
+                instance = self.acquire(tried)
+                tried.append(instance)
+                try:
+                    response = self.session.get(f'{instance.base_url}{path}', params=params,
+                                                headers=headers, timeout=self.timeout, stream=stream)
+                except EmptyPoolError:
+                    self.release(instance, False)
+                    with self.lock:
+                        self.pool_timeouts += 1
+                    metrics.inc('gateway_upstream_pool_timeouts_total', {'upstream': self.name})
+                    raise UpstreamPoolExhausted(f'No free connection to {self.name} within {self.pool_timeout}s')
+                except requests.ConnectionError:
+                    self.release(instance, True)
+                    metrics.inc('gateway_upstream_errors_total', {'upstream': self.name})
+                    if len(tried) < len(self.instances):
+                        continue
+                    raise
+                except Exception:
+                    self.release(instance, True)
+                    metrics.inc('gateway_upstream_errors_total', {'upstream': self.name})
+                    raise
+                self.release(instance, response.status_code >= 500)
+                break
+        self.latency.observe(time.perf_counter() - start_time)
+        return response
+
+    def check_health(self):
+        for instance in self.instances:
+            try:
+                response = self.session.get(f'{instance.base_url}{self.health_path}', timeout=self.timeout[0])
+                healthy = response.status_code == 200
+                response.close()
+            except (requests.RequestException, EmptyPoolError):
+                healthy = False
+            with self.lock:
+                instance.last_checked = datetime.now()
+                if healthy != instance.healthy:
+                    print(f"Upstream {self.name} instance {instance.base_url} "
+                          f"{'recovered' if healthy else 'failed health check'}")
+                instance.healthy = healthy
+                if healthy:
+                    instance.consecutive_failures = 0
+
+    def stats(self) -> Dict[str, Any]:
+        instances = []
+        for instance in self.instances:
+            pool = self.adapter.poolmanager.connection_from_url(instance.base_url)
+            requests_sent = pool.num_requests
+            connections_opened = pool.num_connections
+            instances.append({
+                'url': instance.base_url,
+                'healthy': instance.healthy,
+                'outstanding': instance.outstanding,
+                'requests': instance.requests,
+                'errors': instance.errors,
+                'connections_opened': connections_opened,
+                'reuse_rate': round(1 - connections_opened / requests_sent, 4) if requests_sent else None,
+                'last_checked': instance.last_checked.isoformat() if instance.last_checked else None
+            })
+        return {
+            'pool_size': self.pool_size,
+            'pool_timeouts': self.pool_timeouts,
+            'healthy_instances': sum(1 for instance in self.instances if instance.healthy),
+            'instances': instances,
+            'errors': self.errors,
+            'latency': self.latency.snapshot()
+        }
+
+def stream_upstream_body(response: requests.Response, chunk_size: int = 64 * 1024):
+    completed = False
+    try:
+        for chunk in response.raw.stream(chunk_size, decode_content=False):
+            yield chunk
+        completed = True
+    finally:
+        if completed:
+            response.raw.release_conn()
+        else:
+            response.close()
+
+def close_abandoned_response(future):
+    if future.cancelled() or future.exception() is not None:
+        return
+    body = future.result()[1]
+    if isinstance(body, requests.Response):
+        body.close()
+
+class RedisResponseCache:
+    def __init__(self, client, prefix='epos:gateway', tag_ttl=3600):
+        self.client = client
+        self.prefix = prefix
+        self.tag_ttl = tag_ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.errors = 0
+        self.lock = Lock()
+
+    def count(self, counter: str, amount: int = 1):
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def tag_key(self, tag: str) -> str:
+        return f'{self.prefix}:tag:{tag}'
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            value = self.client.get(f'{self.prefix}:{key}')
+        except Exception as e:
+            print(f"Cache read error: {e}")
+            self.count('errors')
+            return None
+        self.count('hits' if value is not None else 'misses')
+        return value
+
+    def set(self, key: str, value: str, ttl: int, tags=()):
+        try:
+            pipe = self.client.pipeline()
+            pipe.set(f'{self.prefix}:{key}', value, ex=ttl)
+            for tag in tags:
+                pipe.sadd(self.tag_key(tag), key)
+                pipe.expire(self.tag_key(tag), max(ttl, self.tag_ttl))
+            pipe.execute()
+        except Exception as e:
+            print(f"Cache write error: {e}")
+            self.count('errors')
+
+    def invalidate_tags(self, tags) -> int:
+        removed = 0
+        try:
+            for tag in tags:
+                keys = self.client.smembers(self.tag_key(tag))
+                pipe = self.client.pipeline()
+                for key in keys:
+                    pipe.delete(f'{self.prefix}:{key}')
+                pipe.delete(self.tag_key(tag))
+                results = pipe.execute()
+                removed += sum(results[:-1])
+        except Exception as e:
+            print(f"Cache invalidation error: {e}")
+            self.count('errors')
+        self.count('invalidations', removed)
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            evictions = self.client.info('stats').get('evicted_keys', 0)
+        except Exception:
+            evictions = None
+        return {
+            'backend': 'redis',
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / (self.hits + self.misses), 4) if self.hits + self.misses else None,
+            'invalidations': self.invalidations,
+            'evictions': evictions,
+            'errors': self.errors
+        }
+
+class MemoryResponseCache:
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_entry_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes or max_bytes // 8
+        self.entries = OrderedDict()
+        self.tags = {}
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.lock = Lock()
+
+    def remove(self, key: str):
+        value, expires_at, size, tags = self.entries.pop(key)
+        self.size -= size
+        for tag in tags:
+            keys = self.tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tags[tag]
+
+    def get(self, key: str) -> Optional[str]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[1] <= time.monotonic():
+                self.remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: str, value: str, ttl: int, tags=()):
+        size = len(key) + len(value.encode())
+        if size > self.max_entry_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.remove(key)
+            self.entries[key] = (value, time.monotonic() + ttl, size, tuple(tags))
+            self.size += size
+            for tag in tags:
+                self.tags.setdefault(tag, set()).add(key)
+            while self.size > self.max_bytes:
+                oldest = next(iter(self.entries))
+                self.remove(oldest)
+                self.evictions += 1
+
+    def invalidate_tags(self, tags) -> int:
+        removed = 0
+        with self.lock:
+            for tag in tags:
+                for key in list(self.tags.get(tag, ())):
+                    self.remove(key)
+                    removed += 1
+            self.invalidations += removed
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'backend': 'memory',
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / (self.hits + self.misses), 4) if self.hits + self.misses else None,
+                'invalidations': self.invalidations,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'entries': len(self.entries),
+                'bytes': self.size,
+                'max_bytes': self.max_bytes
+            }
+
+class SingleFlight:
+    def __init__(self):
+        self.calls = {}
+        self.lock = Lock()
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = {'event': Event(), 'result': None, 'error': None}
+                self.calls[key] = call
+                self.executed += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            call['event'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result']
+        try:
+            call['result'] = fn()
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self.lock:
+                self.calls.pop(key, None)
+            call['event'].set()
+        return call['result']
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            total = self.executed + self.coalesced
+            return {
+                'upstream_calls': self.executed,
+                'coalesced_requests': self.coalesced,
+                'saved_ratio': round(self.coalesced / total, 4) if total else None,
+                'in_flight': len(self.calls)
+            }
+
+class MessagePublisher:
+    def __init__(self, connect, connection=None, queues=('epos_queue', 'response_queue'),
+                 max_batch: int = 100, max_queue: int = 10000, enqueue_timeout: float = 1.0,
+                 max_retries: int = 3, heartbeat_interval: float = 5.0):
+        self.connect = connect
+        self.connection = connection
+        self.channel = None
+        self.queues = queues
+        self.max_batch = max_batch
+        self.enqueue_timeout = enqueue_timeout
+        self.max_retries = max_retries
+        self.heartbeat_interval = heartbeat_interval
+        self.queue = Queue(maxsize=max_queue)
+        self.published = 0
+        self.batches = 0
+        self.failed = 0
+        self.rejected = 0
+        self.reconnects = 0
+        self.lock = Lock()
+        self.thread = Thread(target=self.run, name='mq-publisher', daemon=True)
+        self.thread.start()
+
+    @property
+    def connected(self) -> bool:
+        return self.connection is not None and not self.connection.is_closed
+
+    def publish(self, routing_key: str, body: str, properties, on_error=None):
+        try:
+            self.queue.put((routing_key, body, properties, on_error), timeout=self.enqueue_timeout)
+        except Full:
+            with self.lock:
+                self.rejected += 1
+            raise RuntimeError('RabbitMQ publisher queue is full')
+
+    def run(self):
+        while True:
+            try:
+                item = self.queue.get(timeout=self.heartbeat_interval)
+            except Empty:
+                self.keep_alive()
+                continue
+            batch = [item]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except Empty:
+                    break
+            self.flush(batch)
+
+    def open_channel(self):
+        if not self.connected:
+            self.connection = self.connect()
+            self.channel = None
+        if self.channel is None or self.channel.is_closed:
+            channel = self.connection.channel()
+            for queue in self.queues:
+                channel.queue_declare(queue=queue, durable=True)
+            channel.tx_select()
+            self.channel = channel
+        return self.channel
+
+    def reset(self):
+        try:
+            if self.connected:
+                self.connection.close()
+        except Exception:
+            pass
+        self.connection = None
+        self.channel = None
+
+    def keep_alive(self):
+        if not self.connected:
+            return
+        try:
+            self.connection.process_data_events(time_limit=0)
+        except Exception as e:
+            print(f"Publisher connection lost: {e}")
+            self.reset()
+
+    def flush(self, batch):
+        error = None
+        for attempt in range(self.max_retries):
+            try:
+                channel = self.open_channel()
+                start_time = time.perf_counter()
+                for routing_key, body, properties, on_error in batch:
+                    channel.basic_publish(exchange='', routing_key=routing_key, body=body, properties=properties)
+                channel.tx_commit()
+                metrics.observe('mq_publish_batch_duration_seconds', time.perf_counter() - start_time)
+                for routing_key, body, properties, on_error in batch:
+                    metrics.inc('mq_published_messages_total', {'queue': routing_key})
+                with self.lock:
+                    self.published += len(batch)
+                    self.batches += 1
+                return
+            except Exception as e:
+                error = e
+                print(f"Publishing batch of {len(batch)} failed (attempt {attempt + 1}/{self.max_retries}): {e}")
+                self.reset()
+                with self.lock:
+                    self.reconnects += 1
+                time.sleep(min(0.1 * 2 ** attempt, 2.0))
+        with self.lock:
+            self.failed += len(batch)
+        for routing_key, body, properties, on_error in batch:
+            if on_error:
+                on_error(error)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'connected': self.connected,
+                'queued': self.queue.qsize(),
+                'published': self.published,
+                'batches': self.batches,
+                'avg_batch_size': round(self.published / self.batches, 2) if self.batches else None,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'reconnects': self.reconnects
+            }
 
 class APIGateway:
+    CACHE_TTLS = {
+        'klijenti': 30,
+        'fakture': 30,
+        'troskovi': 30,
+        'statistike': 60,
+        'kategorije': 300
+    }
+    GLOBAL_RESOURCES = {'fakture', 'troskovi', 'statistike', 'kategorije'}
+    WRITE_INVALIDATIONS = {
+        'create_client': ['klijenti'],
+        'update_client': ['klijenti'],
+        'delete_client': ['klijenti', 'fakture'],
+        'create_invoice': ['fakture', 'troskovi'],
+        'update_invoice': ['fakture'],
+        'delete_invoice': ['fakture', 'troskovi'],
+        'create_expense': ['troskovi'],
+        'update_expense': ['troskovi'],
+        'delete_expense': ['troskovi']
+    }
+    BATCH_MAX_REQUESTS = 20
+    JOB_REPLY_TIMEOUT = 30
+    JOB_MAX_WAIT = 30
+    PUBLIC_ENDPOINTS = {'system_status'}
+    PASSTHROUGH_HEADERS = ('Content-Type', 'Content-Length', 'Content-Encoding', 'ETag', 'Last-Modified', 'Vary',
+                           'Content-Disposition', NEXT_CURSOR_HEADER)
+
     def __init__(self, rabbitmq_host='localhost', redis_host='localhost'):
         self.app = Flask(__name__)
+        instrument_app(self.app, 'api-gateway')
         CORS(self.app)
         self.rabbitmq_host = rabbitmq_host
         self.connection = None
-        self.channel = None
         self.setup_rabbitmq()
+        self.publisher = MessagePublisher(
+            self.connect_rabbitmq, self.connection,
+            max_batch=int(os.getenv('MQ_PUBLISH_BATCH', '100')),
+            max_queue=int(os.getenv('MQ_PUBLISH_QUEUE', '10000'))
+        )
         try:
             self.redis_client = redis.Redis(host=redis_host, port=6379, db=0, decode_responses=True)
             self.redis_client.ping()
@@ -26,49 +575,86 @@ class APIGateway:
             print("Redis connected successfully")
         except:
             self.redis_enabled = False
-            print("Redis not available, caching disabled")
+            print("Redis not available, using in-memory cache")
+        if self.redis_enabled:
+            self.cache = RedisResponseCache(self.redis_client)
+        else:
+            self.cache = MemoryResponseCache(int(os.getenv('GATEWAY_CACHE_MAX_BYTES', str(64 * 1024 * 1024))))
         self.pending_requests = {}
+        self.jobs = OrderedDict()
+        self.job_ttl = int(os.getenv('JOB_TTL', '600'))
         self.lock = Lock()
+        self.expiry_heap = []
+        self.expiry_condition = Condition(self.lock)
+        self.expired_requests = 0
+        self.late_replies = 0
+        self.rpc_latency = metrics.histogram('gateway_rpc_duration_seconds')
+        self.rpc_timeouts = 0
+        self.setup_upstreams()
+        self.single_flight = SingleFlight()
+        self.tenant_single_flight = SingleFlight()
+        self.tenant_cache = TenantCache(int(os.getenv('TENANT_CACHE_TTL', '60')),
+                                        int(os.getenv('TENANT_NEGATIVE_CACHE_TTL', '10')))
+        self.fanout_executor = ThreadPoolExecutor(max_workers=int(os.getenv('FANOUT_MAX_WORKERS', '16')),
+                                                  thread_name_prefix='fanout')
+        self.overview_deadline = float(os.getenv('CLIENT_OVERVIEW_DEADLINE', '3'))
+        self.overview_ids_per_request = int(os.getenv('CLIENT_OVERVIEW_IDS_PER_REQUEST', '100'))
+        self.passthrough_bytes = int(os.getenv('GATEWAY_PASSTHROUGH_BYTES', str(1024 * 1024)))
+        self.tenant_context_ttl = int(os.getenv('TENANT_CONTEXT_TTL', '60'))
+        self.client_page_size = int(os.getenv('KLIJENTI_PAGE_SIZE', '100'))
+        self.client_max_page_size = int(os.getenv('KLIJENTI_MAX_PAGE_SIZE', '500'))
         self.setup_routes()
+        self.register_gauges()
         self.start_response_consumer()
+        self.start_tenant_event_consumer()
+        Thread(target=self.expire_pending_requests, name='pending-expiry', daemon=True).start()
+
+    def register_gauges(self):
+        metrics.register_gauge('gateway_pending_requests', lambda: len(self.pending_requests))
+        metrics.register_gauge('gateway_jobs', lambda: len(self.jobs))
+        metrics.register_gauge('mq_publish_queue_depth', lambda: self.publisher.queue.qsize())
+
+    def setup_upstreams(self):
+        pool_size = int(os.getenv('UPSTREAM_POOL_SIZE', '10'))
+        connect_timeout = float(os.getenv('UPSTREAM_CONNECT_TIMEOUT', '2'))
+        read_timeout = float(os.getenv('UPSTREAM_READ_TIMEOUT', '10'))
+        pool_timeout = float(os.getenv('UPSTREAM_POOL_TIMEOUT', '2'))
+        self.upstreams = {
+            name: UpstreamClient(name, urls, pool_size, connect_timeout, read_timeout, pool_timeout=pool_timeout)
+            for name, urls in self.upstream_urls().items()
+        }
+        self.health_check_interval = float(os.getenv('UPSTREAM_HEALTH_INTERVAL', '5'))
+        if self.health_check_interval > 0:
+            Thread(target=self.check_upstreams, name='upstream-health', daemon=True).start()
+
+    def upstream_urls(self) -> Dict[str, List[str]]:
+        services = {
+            'klijent-service': os.getenv('CLIENT_SERVICE_URL', 'http://klijent-service:5001'),
+            'faktura-service': os.getenv('INVOICE_SERVICE_URL', 'http://faktura-service:5002'),
+            'trosak-service': os.getenv('EXPENSES_SERVICE_URL', 'http://trosak-service:5003'),
+            'tenant-service': os.getenv('TENANT_SERVICE_URL', 'http://tenant-service:5004')
+        }
+        return {name: [url.strip() for url in urls.split(',') if url.strip()] for name, urls in services.items()}
+
+    def check_upstreams(self):
+        while True:
+            time.sleep(self.health_check_interval)
+            for upstream in self.upstreams.values():
+                try:
+                    upstream.check_health()
+                except Exception as e:
+                    print(f"Health check for {upstream.name} failed: {e}")
+
+    def connect_rabbitmq(self) -> pika.BlockingConnection:
+        return connect_rabbitmq(self.rabbitmq_host)
 
     def setup_rabbitmq(self):
         max_retries = 10
         retry_count = 0
         while retry_count < max_retries:
             try:
-                credentials_options = [
-                    pika.PlainCredentials(
-                        os.getenv('RABBITMQ_USER', 'epos_user'),
-                        os.getenv('RABBITMQ_PASSWORD', 'epos_password')
-                    ),
-                    pika.PlainCredentials('guest', 'guest'),
-                    None
-                ]
-                connection_established = False
-                for i, credentials in enumerate(credentials_options):
-                    try:
-                        print(f"Trying connection attempt {i + 1}...")
-                        connection_params = pika.ConnectionParameters(
-                            host=self.rabbitmq_host,
-                            credentials=credentials
-                        )
-                        self.connection = pika.BlockingConnection(connection_params)
-                        self.channel = self.connection.channel()
-                        queues = ['epos_queue', 'response_queue']
-                        for queue in queues:
-                            self.channel.queue_declare(queue=queue, durable=True)
-                        print(f"Connected to RabbitMQ at {self.rabbitmq_host}")
-                        print(f"Using credentials: {credentials.username if credentials else 'anonymous'}")
-                        connection_established = True
-                        break
-                    except Exception as e:
-                        print(f"Credentials attempt {i + 1} failed: {e}")
-                        continue
-                if connection_established:
-                    break
-                else:
-                    raise Exception("All credential attempts failed")
+                self.connection = self.connect_rabbitmq()
+                break
             except Exception as e:
                 retry_count += 1
                 print(f"Failed to connect to RabbitMQ (attempt {retry_count}/{max_retries}): {e}")
@@ -86,10 +672,10 @@ class APIGateway:
                     print("=" * 50)
                     raise
 
-    def send_message_and_wait(self, message_type: str, data: Dict[str, Any],
-                              timeout: int = 30) -> Dict[str, Any]:
-        if not self.connection or self.connection.is_closed:
-            return {'error': 'RabbitMQ connection not available'}
+    def publish_request(self, message_type: str, data: Dict[str, Any], is_job: bool = False,
+                        timeout: int = 30):
+        if not self.publisher.thread.is_alive():
+            return None, {'error': 'RabbitMQ connection not available'}
         correlation_id = str(uuid.uuid4())
         message = {
             'id': correlation_id,
@@ -97,38 +683,139 @@ class APIGateway:
             'timestamp': datetime.now().isoformat(),
             'data': data
         }
+        tenant = request.environ.get('epos.tenant') if has_request_context() else None
+        if tenant:
+            message['tenant_id'] = tenant['id']
+        pending = {
+            'id': correlation_id,
+            'type': message_type,
+            'tenant': self.current_tenant(),
+            'is_job': is_job,
+            'event': Event(),
+            'response': None,
+            'timestamp': datetime.now(),
+            'completed_at': None,
+            'start_time': time.perf_counter(),
+            'started_at': time.time(),
+            'deadline': time.monotonic() + timeout,
+            'trace': tracing.current_trace.get(),
+            'span_id': tracing.new_span_id()
+        }
+        headers = tracing.message_headers(pending['span_id'])
         with self.lock:
-            self.pending_requests[correlation_id] = {
-                'response': None,
-                'timestamp': datetime.now()
-            }
+            self.pending_requests[correlation_id] = pending
+            if is_job:
+                self.jobs[correlation_id] = pending
+            heapq.heappush(self.expiry_heap, (pending['deadline'], correlation_id))
+            if self.expiry_heap[0][1] == correlation_id:
+                self.expiry_condition.notify()
         try:
-            self.channel.basic_publish(
-                exchange='',
-                routing_key='epos_queue',
-                body=json.dumps(message),
-                properties=pika.BasicProperties(
+            self.publisher.publish(
+                'epos_queue',
+                json.dumps(message),
+                pika.BasicProperties(
                     delivery_mode=2,
                     correlation_id=correlation_id,
-                    reply_to='response_queue'
-                )
+                    reply_to='response_queue',
+                    headers=headers
+                ),
+                on_error=lambda e: self.complete_request(correlation_id, {'error': f'Failed to send message: {e}'})
             )
         except Exception as e:
             with self.lock:
                 self.pending_requests.pop(correlation_id, None)
-            return {'error': f'Failed to send message: {e}'}
-        start_time = time.time()
-        while time.time() - start_time < timeout:
+                self.jobs.pop(correlation_id, None)
+            return None, {'error': f'Failed to send message: {e}'}
+        return pending, None
+
+    def send_message_and_wait(self, message_type: str, data: Dict[str, Any],
+                              timeout: int = 30) -> Dict[str, Any]:
+        pending, error = self.publish_request(message_type, data, timeout=timeout)
+        if error:
+            return error
+        completed = pending['event'].wait(timeout)
+        with self.lock:
+            self.pending_requests.pop(pending['id'], None)
+        self.invalidate_for_write(message_type)
+        self.record_rpc_span(pending, completed)
+        if not completed:
             with self.lock:
-                if correlation_id in self.pending_requests:
-                    response = self.pending_requests[correlation_id]['response']
-                    if response is not None:
-                        self.pending_requests.pop(correlation_id)
-                        return response
-            time.sleep(0.1)
+                self.rpc_timeouts += 1
+            metrics.inc('gateway_rpc_timeouts_total')
+            return {'error': 'Request timeout'}
+        self.rpc_latency.observe(time.perf_counter() - pending['start_time'])
+        return pending['response']
+
+    def record_rpc_span(self, pending: Dict[str, Any], completed: bool):
+        if not pending['trace']:
+            return
+        attributes = {'correlation_id': pending['id'], 'status': 'completed' if completed else 'timeout'}
+        if completed and isinstance(pending['response'], dict) and 'error' in pending['response']:
+            attributes['status'] = 'failed'
+        tracing.record_span(pending['trace'][0], pending['span_id'], pending['trace'][1],
+                            f"rpc {pending['type']}", pending['started_at'],
+                            time.perf_counter() - pending['start_time'], attributes)
+
+    def submit_job(self, message_type: str, data: Dict[str, Any]):
+        self.expire_jobs()
+        pending, error = self.publish_request(message_type, data, is_job=True, timeout=self.JOB_REPLY_TIMEOUT)
+        if error:
+            return jsonify(error), 503
+        url = f"/api/jobs/{pending['id']}"
+        response = jsonify({'job_id': pending['id'], 'status': 'pending', 'url': url})
+        response.status_code = 202
+        response.headers['Location'] = url
+        return response
+
+    def async_requested(self) -> bool:
+        return request.args.get('async', '').lower() in ('1', 'true') \
+            or 'respond-async' in request.headers.get('Prefer', '')
+
+    def expire_jobs(self):
+        cutoff = datetime.now() - timedelta(seconds=self.job_ttl)
         with self.lock:
-            self.pending_requests.pop(correlation_id, None)
-        return {'error': 'Request timeout'}
+            while self.jobs:
+                job = next(iter(self.jobs.values()))
+                if job['timestamp'] >= cutoff:
+                    break
+                self.jobs.pop(job['id'])
+                self.pending_requests.pop(job['id'], None)
+
+    def job_status(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        response = job['response']
+        if response is None:
+            age = (datetime.now() - job['timestamp']).total_seconds()
+            status = 'timeout' if age > self.JOB_REPLY_TIMEOUT else 'pending'
+        else:
+            status = 'failed' if 'error' in response else 'completed'
+        return {
+            'job_id': job['id'],
+            'type': job['type'],
+            'status': status,
+            'result': response,
+            'created_at': job['timestamp'].isoformat(),
+            'completed_at': job['completed_at'].isoformat() if job['completed_at'] else None
+        }
+
+    def complete_request(self, correlation_id: str, response: Dict[str, Any]) -> bool:
+        with self.lock:
+            pending = self.pending_requests.get(correlation_id)
+            if pending is None:
+                self.late_replies += 1
+                return False
+            if pending.get('is_job'):
+                self.pending_requests.pop(correlation_id, None)
+        pending['response'] = response
+        pending['completed_at'] = datetime.now()
+        pending['event'].set()
+        if pending.get('is_job'):
+            self.rpc_latency.observe(time.perf_counter() - pending['start_time'])
+            self.record_rpc_span(pending, True)
+            self.invalidate_for_write(pending['type'], pending['tenant'])
+        return True
+
+    def start_tenant_event_consumer(self):
+        start_tenant_event_consumer(self.connect_rabbitmq, self.tenant_cache.handle_event)
 
     def start_response_consumer(self):
         def consume_responses():
@@ -159,17 +846,18 @@ class APIGateway:
                 consumer_channel = consumer_connection.channel()
                 consumer_channel.queue_declare(queue='response_queue', durable=True)
                 def process_response(ch, method, properties, body):
+                    start_time = time.perf_counter()
                     try:
                         response = json.loads(body)
                         correlation_id = properties.correlation_id
                         if correlation_id:
-                            with self.lock:
-                                if correlation_id in self.pending_requests:
-                                    self.pending_requests[correlation_id]['response'] = response
+                            self.complete_request(correlation_id, response)
                         ch.basic_ack(delivery_tag=method.delivery_tag)
                     except Exception as e:
                         print(f"Error processing response: {e}")
                         ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+                    metrics.observe('mq_consume_duration_seconds', time.perf_counter() - start_time,
+                                    {'queue': 'response_queue'})
                 consumer_channel.basic_consume(
                     queue='response_queue',
                     on_message_callback=process_response
@@ -182,12 +870,33 @@ class APIGateway:
         consumer_thread.start()
 
     def setup_routes(self):
+        @self.app.before_request
+        def authenticate_tenant():
+            if request.method == 'OPTIONS' or not request.path.startswith('/api/') \
+                    or request.endpoint in self.PUBLIC_ENDPOINTS:
+                return
+            api_key = request.headers.get('X-Tenant-API-Key')
+            if not api_key:
+                return jsonify({'error': 'Missing X-Tenant-API-Key header'}), 401
+            try:
+                tenant = self.resolve_tenant(api_key)
+            except Exception as e:
+                print(f"Tenant lookup failed: {e}")
+                return jsonify({'error': 'Tenant service unavailable'}), 503
+            if not tenant:
+                return jsonify({'error': 'Invalid or inactive tenant'}), 401
+            request.environ['epos.tenant'] = tenant
+
+        enable_conditional_responses(self.app)
+
         @self.app.route('/api/klijenti', methods=['GET', 'POST'])
         def klijenti_api():
             if request.method == 'POST':
                 data = request.json
                 if not data or not all(k in data for k in ['naziv', 'email']):
                     return jsonify({'error': 'Nedostaju obavezni podaci (naziv, email)'}), 400
+                if self.async_requested():
+                    return self.submit_job('create_client', data)
                 response = self.send_message_and_wait('create_client', data)
                 if 'error' in response:
                     return jsonify(response), 400 if 'već postoji' in response['error'] else 500
@@ -195,6 +904,10 @@ class APIGateway:
             else:
                 return self.get_clients()
 
+        @self.app.route('/api/klijenti/search', methods=['GET'])
+        def pretraga_klijenata_api():
+            return self.search_clients()
+
         @self.app.route('/api/klijenti/<klijent_id>', methods=['GET', 'PUT', 'DELETE'])
         def klijent_api(klijent_id):
             if request.method == 'PUT':
@@ -202,11 +915,15 @@ class APIGateway:
                 if not data:
                     return jsonify({'error': 'Nedostaju podaci'}), 400
                 data['klijent_id'] = klijent_id
+                if self.async_requested():
+                    return self.submit_job('update_client', data)
                 response = self.send_message_and_wait('update_client', data)
                 if 'error' in response:
                     return jsonify(response), 404 if 'nije pronađen' in response['error'] else 500
                 return jsonify({'status': 'success'})
             elif request.method == 'DELETE':
+                if self.async_requested():
+                    return self.submit_job('delete_client', {'klijent_id': klijent_id})
                 response = self.send_message_and_wait('delete_client', {'klijent_id': klijent_id})
                 if 'error' in response:
                     return jsonify(response), 404 if 'nije pronađen' in response['error'] else 500
@@ -214,6 +931,10 @@ class APIGateway:
             else:
                 return self.get_client(klijent_id)
 
+        @self.app.route('/api/klijenti/<klijent_id>/pregled', methods=['GET'])
+        def klijent_pregled_api(klijent_id):
+            return self.get_client_overview(klijent_id)
+
         @self.app.route('/api/fakture', methods=['POST'])
         def fakture_api():
             data = request.json
@@ -221,6 +942,8 @@ class APIGateway:
                 return jsonify({'error': 'Nedostaju obavezni podaci (klijent_id, stavke)'}), 400
             if not data['stavke']:
                 return jsonify({'error': 'Faktura mora imati najmanje jednu stavku'}), 400
+            if self.async_requested():
+                return self.submit_job('create_invoice', data)
             response = self.send_message_and_wait('create_invoice', data)
             if 'error' in response:
                 return jsonify(response), 400
@@ -233,11 +956,15 @@ class APIGateway:
                 if not data:
                     return jsonify({'error': 'Nedostaju podaci'}), 400
                 data['faktura_id'] = faktura_id
+                if self.async_requested():
+                    return self.submit_job('update_invoice', data)
                 response = self.send_message_and_wait('update_invoice', data)
                 if 'error' in response:
                     return jsonify(response), 404 if 'nije pronađen' in response['error'] else 500
                 return jsonify({'status': 'success'})
             elif request.method == 'DELETE':
+                if self.async_requested():
+                    return self.submit_job('delete_invoice', {'faktura_id': faktura_id})
                 response = self.send_message_and_wait('delete_invoice', {'faktura_id': faktura_id})
                 if 'error' in response:
                     return jsonify(response), 404 if 'nije pronađen' in response['error'] else 500
@@ -255,6 +982,8 @@ class APIGateway:
                 data = request.json
                 if not data or not all(k in data for k in ['naziv', 'kategorija', 'iznos', 'datum']):
                     return jsonify({'error': 'Nedostaju obavezni podaci (naziv, kategorija, iznos, datum)'}), 400
+                if self.async_requested():
+                    return self.submit_job('create_expense', data)
                 response = self.send_message_and_wait('create_expense', data)
                 if 'error' in response:
                     return jsonify(response), 400
@@ -275,11 +1004,15 @@ class APIGateway:
                 if not data:
                     return jsonify({'error': 'Nedostaju podaci'}), 400
                 data['trosak_id'] = trosak_id
+                if self.async_requested():
+                    return self.submit_job('update_expense', data)
                 response = self.send_message_and_wait('update_expense', data)
                 if 'error' in response:
                     return jsonify(response), 404 if 'nije pronađen' in response['error'] else 500
                 return jsonify({'status': 'success'})
             elif request.method == 'DELETE':
+                if self.async_requested():
+                    return self.submit_job('delete_expense', {'trosak_id': trosak_id})
                 response = self.send_message_and_wait('delete_expense', {'trosak_id': trosak_id})
                 if 'error' in response:
                     return jsonify(response), 404 if 'nije pronađen' in response['error'] else 500
@@ -291,6 +1024,10 @@ class APIGateway:
         def kategorije_api():
             return self.get_categories()
 
+        @self.app.route('/api/klijenti/export', methods=['GET'])
+        def export_api():
+            return self.proxy_export('klijent-service', '/api/klijenti/export')
+
         @self.app.route('/api/troskovi/statistike', methods=['GET'])
         def statistike_api():
             filters = {
@@ -299,105 +1036,336 @@ class APIGateway:
             }
             return self.get_statistics(filters)
 
+        @self.app.route('/api/jobs/<job_id>', methods=['GET'])
+        def job_api(job_id):
+            with self.lock:
+                job = self.jobs.get(job_id)
+            if job is None or job['tenant'] != self.current_tenant():
+                return jsonify({'error': 'Posao nije pronađen'}), 404
+            try:
+                wait_seconds = min(float(request.args.get('wait', 0)), self.JOB_MAX_WAIT)
+            except ValueError:
+                return jsonify({'error': 'Neispravan parametar wait'}), 400
+            if wait_seconds > 0:
+                job['event'].wait(wait_seconds)
+            return jsonify(self.job_status(job))
+
+        @self.app.route('/api/batch', methods=['POST'])
+        def batch_api():
+            data = request.json
+            sub_requests = data.get('requests') if isinstance(data, dict) else data
+            if not isinstance(sub_requests, list) or not sub_requests:
+                return jsonify({'error': 'Nedostaju podaci (requests)'}), 400
+            if len(sub_requests) > self.BATCH_MAX_REQUESTS:
+                return jsonify({'error': f'Najviše {self.BATCH_MAX_REQUESTS} zahtjeva po batch-u'}), 400
+            headers = self.upstream_headers()
+            results = [None] * len(sub_requests)
+            reads = []
+            for index, sub in enumerate(sub_requests):
+                path = sub.get('path', '') if isinstance(sub, dict) else ''
+                if not isinstance(path, str) or not path.startswith('/api/') or path.startswith('/api/batch'):
+                    results[index] = {
+                        'id': sub.get('id') if isinstance(sub, dict) else None,
+                        'status': 400,
+                        'body': {'error': 'Neispravan zahtjev'}
+                    }
+                elif str(sub.get('method', 'GET')).upper() == 'GET':
+                    reads.append(index)
+                else:
+                    results[index] = self.dispatch_subrequest(sub, headers)
+            futures = {index: self.fanout_executor.submit(contextvars.copy_context().run, self.dispatch_subrequest,
+                                                          sub_requests[index], headers)
+                       for index in reads}
+            for index, future in futures.items():
+                results[index] = future.result()
+            return jsonify({'responses': results})
+
         @self.app.route('/health')
         def health():
             return jsonify({
                 'status': 'ok',
                 'service': 'api-gateway',
-                'rabbitmq_connected': self.connection and not self.connection.is_closed,
-                'redis_enabled': self.redis_enabled
+                'rabbitmq_connected': self.publisher.connected,
+                'redis_enabled': self.redis_enabled,
+                'cache': self.cache.stats() if self.cache else None
             })
 
         @self.app.route('/api/system/status')
         def system_status():
             return jsonify({
                 'gateway': 'running',
-                'rabbitmq': 'connected' if self.connection and not self.connection.is_closed else 'disconnected',
+                'rabbitmq': 'connected' if self.publisher.connected else 'disconnected',
+                'publisher': self.publisher.stats(),
                 'redis': 'enabled' if self.redis_enabled else 'disabled',
                 'pending_requests': len(self.pending_requests),
+                'expired_requests': self.expired_requests,
+                'late_replies': self.late_replies,
+                'expiry_queue': len(self.expiry_heap),
+                'jobs': len(self.jobs),
+                'rpc_latency': self.rpc_latency.snapshot(),
+                'rpc_timeouts': self.rpc_timeouts,
+                'upstreams': {name: upstream.stats() for name, upstream in self.upstreams.items()},
+                'coalescing': self.single_flight.stats(),
+                'tenant_cache': self.tenant_cache.stats(),
+                'tenant_lookups': self.tenant_single_flight.stats(),
                 'timestamp': datetime.now().isoformat()
             })
 
-    def get_clients(self):
+    def dispatch_subrequest(self, sub: Dict[str, Any], headers: Dict[str, str]) -> Dict[str, Any]:
         try:
-            import requests
-            response = requests.get('http://klijent-service:5001/api/klijenti')
-            return jsonify(response.json())
-        except:
-            return jsonify({'error': 'Servis nedostupan'}), 503
+            with self.app.test_request_context(sub['path'], method=str(sub.get('method', 'GET')).upper(),
+                                               query_string=sub.get('query'), json=sub.get('body'),
+                                               headers=dict(headers, **{'Accept-Encoding': 'identity'}),
+                                               environ_base={SUBREQUEST_ENVIRON_KEY: True}):
+                response = self.app.full_dispatch_request()
+                response.direct_passthrough = False
+                body = response.get_json(silent=True)
+                if body is None:
+                    body = response.get_data(as_text=True)
+        except Exception as e:
+            print(f"Batch sub-request error: {e}")
+            return {'id': sub.get('id'), 'status': 500, 'body': {'error': 'Greška na serveru'}}
+        return {'id': sub.get('id'), 'status': response.status_code, 'body': body}
 
-    def get_client(self, klijent_id):
+    def resolve_tenant(self, api_key: str) -> Optional[Dict[str, Any]]:
+        found, tenant = self.tenant_cache.get(api_key)
+        if found:
+            return tenant
+        tenant = self.tenant_single_flight.do(TenantCache.key(api_key), lambda: self.lookup_tenant(api_key))
+        self.tenant_cache.set(api_key, tenant)
+        return tenant
+
+    def lookup_tenant(self, api_key: str) -> Optional[Dict[str, Any]]:
+        response = self.upstreams['tenant-service'].get('/api/tenant/info', headers={'X-Tenant-API-Key': api_key})
+        if response.status_code in (401, 403, 404):
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    def current_tenant(self) -> str:
+        api_key = request.headers.get('X-Tenant-API-Key') if has_request_context() else None
+        if not api_key:
+            return 'anonymous'
+        return hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+    def upstream_headers(self) -> Dict[str, str]:
+        headers = {}
+        if has_request_context():
+            api_key = request.headers.get('X-Tenant-API-Key')
+            if api_key:
+                headers['X-Tenant-API-Key'] = api_key
+                tenant = request.environ.get('epos.tenant')
+                context = sign_tenant_context(tenant, api_key, self.tenant_context_ttl) if tenant else None
+                if context:
+                    headers[TENANT_CONTEXT_HEADER] = context
+            headers['Accept-Encoding'] = request.headers.get('Accept-Encoding', 'identity')
+        return headers
+
+    def invalidate_for_write(self, message_type: str, tenant: Optional[str] = None):
+        tags = self.WRITE_INVALIDATIONS.get(message_type)
+        if self.cache and tags:
+            tenant = tenant or self.current_tenant()
+            self.cache.invalidate_tags([self.cache_scope(tag, tenant) for tag in tags])
+
+    def cache_scope(self, resource: str, tenant: str) -> str:
+        return f'global:{resource}' if resource in self.GLOBAL_RESOURCES else f'{tenant}:{resource}'
+
+    def fetch_cached(self, service: str, path: str, resource: str, params: Optional[Dict[str, Any]] = None,
+                     tags=(), not_found_error: Optional[str] = None):
+        tenant = self.current_tenant()
+        query = '&'.join(f'{k}={v}' for k, v in sorted((params or {}).items()))
+        cache_key = f'{self.cache_scope(resource, tenant)}:{service}:{path}?{query}'
+        if self.cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return 200, cached
+        leader = []
+        def fetch():
+            leader.append(True)
+            return self.fetch_upstream(service, path, params, not_found_error, cache_key,
+                                       self.CACHE_TTLS[resource],
+                                       [self.cache_scope(tag, tenant) for tag in (resource,) + tuple(tags)])
+        status_code, body = self.single_flight.do(cache_key, fetch)
+        if isinstance(body, requests.Response) and not leader:
+            return self.fetch_upstream(service, path, params, not_found_error)
+        return status_code, body
+
+    def fetch_upstream(self, service: str, path: str, params: Optional[Dict[str, Any]] = None,
+                       not_found_error: Optional[str] = None, cache_key: Optional[str] = None,
+                       ttl: int = 0, tags=()):
+        response = self.upstreams[service].get(path, params=params, headers=self.upstream_headers(), stream=True)
+        if response.status_code == 404 and not_found_error:
+            response.close()
+            return 404, None
+        content_length = response.headers.get('Content-Length')
+        if content_length is None or int(content_length) > self.passthrough_bytes:
+            return response.status_code, response
+        body = response.content.decode('utf-8')
+        if self.cache and cache_key and response.status_code == 200:
+            self.cache.set(cache_key, body, ttl, tags)
+        return response.status_code, body
+
+    def proxy_get(self, service: str, path: str, resource: str, params: Optional[Dict[str, Any]] = None,
+                  tags=(), not_found_error: Optional[str] = None):
         try:
-            import requests
-            response = requests.get(f'http://klijent-service:5001/api/klijenti/{klijent_id}')
-            if response.status_code == 404:
-                return jsonify({'error': 'Klijent nije pronađen'}), 404
-            return jsonify(response.json())
+            status_code, body = self.fetch_cached(service, path, resource, params, tags, not_found_error)
         except:
             return jsonify({'error': 'Servis nedostupan'}), 503
+        if status_code == 404 and not_found_error:
+            return jsonify({'error': not_found_error}), 404
+        return self.upstream_response(status_code, body)
 
-    def get_invoice(self, faktura_id):
+    def proxy_export(self, service: str, path: str):
         try:
-            import requests
-            response = requests.get(f'http://faktura-service:5002/api/fakture/{faktura_id}')
-            if response.status_code == 404:
-                return jsonify({'error': 'Faktura nije pronađena'}), 404
-            return jsonify(response.json())
+            status_code, body = self.fetch_upstream(service, path, request.args.to_dict())
         except:
             return jsonify({'error': 'Servis nedostupan'}), 503
+        return self.upstream_response(status_code, body)
 
-    def get_client_invoices(self, klijent_id):
+    def upstream_response(self, status_code: int, body):
+        if isinstance(body, requests.Response):
+            etag = body.headers.get('ETag')
+            if status_code == 200 and etag and etag.strip('"') in request.if_none_match:
+                body.close()
+                return Response(status=304, headers={'ETag': etag, 'Vary': 'Accept-Encoding'})
+            headers = {name: body.headers[name] for name in self.PASSTHROUGH_HEADERS if name in body.headers}
+            return Response(stream_upstream_body(body), status=status_code, headers=headers,
+                            direct_passthrough=True)
+        return Response(body, status=status_code, mimetype='application/json')
+
+    def get_client_overview(self, klijent_id):
+        deadline = time.monotonic() + self.overview_deadline
+        results = {}
+        errors = {}
+
+        def submit(service, path, resource, params=None, not_found_error=None):
+            @copy_current_request_context
+            def fetch_part():
+                return self.fetch_cached(service, path, resource, params, not_found_error=not_found_error)
+            return self.fanout_executor.submit(contextvars.copy_context().run, fetch_part)
+
+        def collect(part, future):
+            if not future.done():
+                if not future.cancel():
+                    future.add_done_callback(close_abandoned_response)
+                errors[part] = 'timeout'
+                return None
+            try:
+                status_code, body = future.result()
+            except Exception:
+                errors[part] = 'Servis nedostupan'
+                return None
+            if isinstance(body, requests.Response):
+                try:
+                    if status_code == 200:
+                        results[part] = body.json()
+                finally:
+                    body.close()
+            elif status_code == 200:
+                results[part] = json.loads(body)
+            if status_code != 200:
+                errors[part] = f'HTTP {status_code}'
+            return status_code
+
+        klijent = submit('klijent-service', f'/api/klijenti/{klijent_id}', 'klijenti',
+                         not_found_error='Klijent nije pronađen')
+        fakture = submit('faktura-service', f'/api/klijenti/{klijent_id}/fakture', 'fakture')
+        wait([fakture], timeout=max(0, deadline - time.monotonic()))
+        collect('fakture', fakture)
+        troskovi = []
+        if isinstance(results.get('fakture'), list):
+            faktura_ids = sorted({faktura.get('id') for faktura in results['fakture'] if faktura.get('id')})
+            step = self.overview_ids_per_request
+            troskovi = [submit('trosak-service', '/api/troskovi', 'troskovi',
+                               {'povezano_sa': ','.join(faktura_ids[i:i + step])})
+                        for i in range(0, len(faktura_ids), step)]
+        else:
+            errors['troskovi'] = 'fakture nedostupne'
+        wait([klijent] + troskovi, timeout=max(0, deadline - time.monotonic()))
+        klijent_status = collect('klijent', klijent)
+        if 'troskovi' not in errors:
+            povezani = []
+            for future in troskovi:
+                if collect('troskovi', future) == 200:
+                    povezani.extend(results['troskovi'])
+            results['troskovi'] = None if 'troskovi' in errors else povezani
+        if klijent_status == 404:
+            return jsonify({'error': 'Klijent nije pronađen'}), 404
+        return jsonify({
+            'klijent': results.get('klijent'),
+            'fakture': results.get('fakture'),
+            'troskovi': results.get('troskovi'),
+            'partial': bool(errors),
+            'errors': errors
+        })
+
+    def get_clients(self):
         try:
-            import requests
-            response = requests.get(f'http://faktura-service:5002/api/klijenti/{klijent_id}/fakture')
-            return jsonify(response.json())
-        except:
-            return jsonify({'error': 'Servis nedostupan'}), 503
+            params = {'limit': page_limit(request.args.get('limit'), self.client_page_size, self.client_max_page_size)}
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if request.args.get('cursor'):
+            params['cursor'] = request.args['cursor']
+        response = self.proxy_get('klijent-service', '/api/klijenti', 'klijenti', params)
+        if isinstance(response, Response) and response.status_code == 200 and not response.direct_passthrough:
+            klijenti = json.loads(response.get_data())
+            cursor = next_cursor(klijenti, params['limit']) if isinstance(klijenti, list) else None
+            if cursor:
+                response.headers[NEXT_CURSOR_HEADER] = cursor
+        return response
+
+    def search_clients(self):
+        q = request.args.get('q', '').strip()
+        if not q:
+            return jsonify({'error': 'Nedostaje parametar q'}), 400
+        params = {'q': q}
+        for name in ('limit', 'cursor'):
+            if request.args.get(name):
+                params[name] = request.args[name]
+        return self.proxy_get('klijent-service', '/api/klijenti/search', 'klijenti', params)
+
+    def get_client(self, klijent_id):
+        return self.proxy_get('klijent-service', f'/api/klijenti/{klijent_id}', 'klijenti',
+                              not_found_error='Klijent nije pronađen')
+
+    def get_invoice(self, faktura_id):
+        return self.proxy_get('faktura-service', f'/api/fakture/{faktura_id}', 'fakture',
+                              not_found_error='Faktura nije pronađena')
+
+    def get_client_invoices(self, klijent_id):
+        return self.proxy_get('faktura-service', f'/api/klijenti/{klijent_id}/fakture', 'fakture')
 
     def get_expenses(self, filters):
-        try:
-            import requests
-            params = {k: v for k, v in filters.items() if v}
-            response = requests.get('http://trosak-service:5003/api/troskovi', params=params)
-            return jsonify(response.json())
-        except:
-            return jsonify({'error': 'Servis nedostupan'}), 503
+        params = {k: v for k, v in filters.items() if v}
+        return self.proxy_get('trosak-service', '/api/troskovi', 'troskovi', params=params)
 
     def get_expense(self, trosak_id):
-        try:
-            import requests
-            response = requests.get(f'http://trosak-service:5003/api/troskovi/{trosak_id}')
-            if response.status_code == 404:
-                return jsonify({'error': 'Trošak nije pronađen'}), 404
-            return jsonify(response.json())
-        except:
-            return jsonify({'error': 'Servis nedostupan'}), 503
+        return self.proxy_get('trosak-service', f'/api/troskovi/{trosak_id}', 'troskovi',
+                              not_found_error='Trošak nije pronađen')
 
     def get_categories(self):
-        try:
-            import requests
-            response = requests.get('http://trosak-service:5003/api/kategorije')
-            return jsonify(response.json())
-        except:
-            return jsonify({'error': 'Servis nedostupan'}), 503
+        return self.proxy_get('trosak-service', '/api/kategorije', 'kategorije')
 
     def get_statistics(self, filters):
-        try:
-            import requests
-            params = {k: v for k, v in filters.items() if v}
-            response = requests.get('http://trosak-service:5003/api/troskovi/statistike', params=params)
-            return jsonify(response.json())
-        except:
-            return jsonify({'error': 'Servis nedostupan'}), 503
+        params = {k: v for k, v in filters.items() if v}
+        return self.proxy_get('trosak-service', '/api/troskovi/statistike', 'statistike',
+                              params=params, tags=('troskovi',))
 
-    def cleanup_pending_requests(self):
-        cutoff = datetime.now() - timedelta(minutes=5)
-        with self.lock:
-            expired = [req_id for req_id, req_data in self.pending_requests.items()
-                       if req_data['timestamp'] < cutoff]
-            for req_id in expired:
-                self.pending_requests.pop(req_id, None)
-        print(f"Cleaned up {len(expired)} expired requests")
+    def expire_pending_requests(self):
+        with self.expiry_condition:
+            while True:
+                now = time.monotonic()
+                while self.expiry_heap and self.expiry_heap[0][0] <= now:
+                    deadline, correlation_id = heapq.heappop(self.expiry_heap)
+                    pending = self.pending_requests.get(correlation_id)
+                    if pending is not None and pending['deadline'] <= now:
+                        del self.pending_requests[correlation_id]
+                        self.expired_requests += 1
+                        metrics.inc('gateway_expired_requests_total')
+                if len(self.expiry_heap) > 2 * len(self.pending_requests) + 1024:
+                    self.expiry_heap = [entry for entry in self.expiry_heap if entry[1] in self.pending_requests]
+                    heapq.heapify(self.expiry_heap)
+                self.expiry_condition.wait(self.expiry_heap[0][0] - now if self.expiry_heap else None)
 
     def run(self, host='0.0.0.0', port=8080, debug=False):
         print(f"Starting API Gateway on {host}:{port}")
@@ -408,13 +1376,6 @@ if __name__ == "__main__":
     redis_host = os.getenv('REDIS_HOST', 'localhost')
     try:
         gateway = APIGateway(rabbitmq_host=rabbitmq_host, redis_host=redis_host)
-        import threading
-        def cleanup_task():
-            while True:
-                time.sleep(300)
-                gateway.cleanup_pending_requests()
-        cleanup_thread = threading.Thread(target=cleanup_task, daemon=True)
-        cleanup_thread.start()
         gateway.run(debug=os.getenv('DEBUG', 'false').lower() == 'true')
     except KeyboardInterrupt:
         print("\nShutting down gracefully...")
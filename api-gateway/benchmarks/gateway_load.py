@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+import json
+import random
+import argparse
+from datetime import datetime
+
+from support import FakeBroker, BenchmarkGateway, LoadGenerator, start_fake_upstreams
+
+READ_PATHS = ['/api/klijenti', '/api/troskovi', '/api/kategorije', '/api/troskovi/statistike',
+              '/api/klijenti/{id}', '/api/klijenti/{id}/fakture']
+
+def write_operation(index):
+    kind = index % 3
+    if kind == 0:
+        return '/api/klijenti', {'naziv': f'Load {index}', 'email': f'load{index}@test.ba'}
+    if kind == 1:
+        return '/api/fakture', {'klijent_id': f'klijent-{index % 100}',
+                                'stavke': [{'naziv': 'Usluga', 'kolicina': 1, 'cijena': 100}]}
+    return '/api/troskovi', {'naziv': f'Trošak {index}', 'kategorija': 'materijal',
+                             'iznos': 10.5, 'datum': '2024-05-01'}
+
+def main():
+    parser = argparse.ArgumentParser(description='Open-loop load against APIGateway with fake upstreams and broker')
+    parser.add_argument('--rps', type=float, default=500)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=64)
+    parser.add_argument('--read-ratio', type=float, default=0.8)
+    parser.add_argument('--tenants', type=int, default=10)
+    parser.add_argument('--clients', type=int, default=100, help='distinct client ids used in read paths')
+    parser.add_argument('--upstream-latency-ms', type=float, default=5.0)
+    parser.add_argument('--payload-bytes', type=int, default=4096)
+    parser.add_argument('--replicas', type=int, default=1, help='fake upstream instances per service')
+    parser.add_argument('--broker-workers', type=int, default=4)
+    parser.add_argument('--handler-latency-ms', type=float, default=2.0)
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write the JSON report to this file')
+    args = parser.parse_args()
+
+    upstreams = start_fake_upstreams(args.upstream_latency_ms / 1000, args.payload_bytes, args.replicas)
+    broker = FakeBroker(args.broker_workers, args.handler_latency_ms / 1000)
+    gateway = BenchmarkGateway(broker, upstreams)
+    if args.no_cache:
+        gateway.cache = None
+    rng = random.Random(args.seed)
+    api_keys = [f'benchmark-tenant-{i}' for i in range(args.tenants)]
+
+    def next_operation(index):
+        headers = {'X-Tenant-API-Key': rng.choice(api_keys)}
+        if rng.random() < args.read_ratio:
+            path = rng.choice(READ_PATHS).format(id=f'klijent-{rng.randrange(args.clients)}')
+            return 'read', lambda client: client.get(path, headers=headers).status_code == 200
+        path, payload = write_operation(index)
+        return 'write', lambda client: client.post(path, json=payload, headers=headers).status_code == 200
+
+    generator = LoadGenerator(args.rps, args.duration, args.workers)
+    report = generator.run(next_operation, lambda: gateway.app.test_client())
+    report['config'] = vars(args)
+    report['timestamp'] = datetime.now().isoformat()
+    report['gateway'] = {
+        'rpc_latency': gateway.rpc_latency.snapshot(),
+        'rpc_timeouts': gateway.rpc_timeouts,
+        'publisher': gateway.publisher.stats(),
+        'coalescing': gateway.single_flight.stats(),
+        'tenant_cache': gateway.tenant_cache.stats(),
+        'cache': gateway.cache.stats() if gateway.cache else None,
+        'upstreams': {name: upstream.stats() for name, upstream in gateway.upstreams.items()}
+    }
+    report['upstream_requests'] = {name: [replica.requests for replica in replicas]
+                                   for name, replicas in upstreams.items()}
+
+    for kind, result in report['results'].items():
+        if result['requests']:
+            print(f"{kind:<6} requests={result['requests']:>6} rps={result['throughput_rps']:>8} "
+                  f"p50={result['p50_ms']:>8} ms p95={result['p95_ms']:>8} ms p99={result['p99_ms']:>8} ms "
+                  f"errors={result['errors']}")
+    print(f"target_rps={report['target_rps']} achieved_rps={report['achieved_rps']}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+import json
+import time
+import argparse
+import tracemalloc
+
+def build_payload(rows):
+    troskovi = [{
+        'id': f'{i:08d}-0000-4000-8000-000000000000',
+        'naziv': f'Trošak {i}',
+        'kategorija': 'materijal',
+        'iznos': round(i * 1.37, 2),
+        'datum': '2024-05-01',
+        'opis': f'Automatski kreiran trošak za fakturu FAK-{i:06d}',
+        'status': 'planiran',
+        'povezano_sa': None,
+        'datum_kreiranja': '2024-05-01T10:00:00'
+    } for i in range(rows)]
+    return json.dumps(troskovi).encode()
+
+def decode_reencode(gateway, upstream_url):
+    from flask import jsonify
+    with gateway.app.test_request_context('/api/troskovi'):
+        response = gateway.upstreams['trosak-service'].get('/api/troskovi')
+        body = jsonify(response.json()).get_data()
+    return len(body)
+
+def through_gateway(gateway, upstream_url):
+    client = gateway.app.test_client()
+    response = client.get('/api/troskovi', headers={'X-Tenant-API-Key': 'benchmark'}, buffered=False)
+    size = 0
+    for chunk in response.response:
+        size += len(chunk)
+    response.close()
+    return size
+
+def measure(name, fn, gateway, upstream_url, repeats):
+    timings = []
+    size = 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        size = fn(gateway, upstream_url)
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn(gateway, upstream_url)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'mode': name,
+        'bytes': size,
+        'best_ms': round(min(timings) * 1000, 1),
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 1),
+        'peak_python_mb': round(peak / 1024 / 1024, 1)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Gateway /api/troskovi proxy cost for a large upstream response')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+    payload = build_payload(args.rows)
+    from support import BenchmarkGateway, FakeUpstream
+    upstream = FakeUpstream(payload=payload)
+    upstream_url = upstream.url
+    gateway = BenchmarkGateway(upstreams={'trosak-service': upstream})
+    gateway.cache = None
+    results = [measure('decode + jsonify', decode_reencode, gateway, upstream_url, args.repeats)]
+    gateway.passthrough_bytes = len(payload) + 1
+    results.append(measure('buffered bytes', through_gateway, gateway, upstream_url, args.repeats))
+    gateway.passthrough_bytes = 0
+    results.append(measure('streaming passthrough', through_gateway, gateway, upstream_url, args.repeats))
+    print(f"rows={args.rows} upstream_bytes={len(payload)}")
+    for result in results:
+        print(f"{result['mode']:<22} best={result['best_ms']:>8} ms mean={result['mean_ms']:>8} ms "
+              f"peak={result['peak_python_mb']:>7} MB")
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+import json
+import time
+import argparse
+from threading import Thread
+
+import pika
+
+from support import FakeBroker, FakeConnection
+from app import MessagePublisher
+
+BENCHMARK_QUEUE = 'epos_benchmark_queue'
+
+def run_batch_size(connect, batch_size, messages, producers):
+    publisher = MessagePublisher(connect, queues=(BENCHMARK_QUEUE,), max_batch=batch_size,
+                                 max_queue=messages + 1)
+    body = json.dumps({'type': 'create_client', 'data': {'naziv': 'Benchmark d.o.o.', 'email': 'b@test.ba'}})
+    properties = pika.BasicProperties(delivery_mode=2, correlation_id='benchmark')
+    per_producer = messages // producers
+
+    def produce():
+        for _ in range(per_producer):
+            publisher.publish(BENCHMARK_QUEUE, body, properties)
+
+    threads = [Thread(target=produce) for _ in range(producers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    total = per_producer * producers
+    while publisher.stats()['published'] + publisher.stats()['failed'] < total:
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    stats = publisher.stats()
+    publisher.reset()
+    return {
+        'batch_size': batch_size,
+        'messages': total,
+        'messages_per_sec': round(total / elapsed),
+        'avg_batch_size': stats['avg_batch_size'],
+        'failed': stats['failed']
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='MessagePublisher throughput at different batch sizes')
+    parser.add_argument('--batch-sizes', default='1,10,50,100,500')
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--producers', type=int, default=16)
+    parser.add_argument('--commit-latency-ms', type=float, default=0.5,
+                        help='simulated broker round trip per tx_commit (ignored with --rabbitmq-host)')
+    parser.add_argument('--rabbitmq-host', help='publish to a real broker instead of the in-process stand-in')
+    args = parser.parse_args()
+    if args.rabbitmq_host:
+        def connect():
+            return pika.BlockingConnection(pika.ConnectionParameters(host=args.rabbitmq_host))
+    else:
+        broker = FakeBroker(workers=0, commit_latency=args.commit_latency_ms / 1000)
+
+        def connect():
+            return FakeConnection(broker)
+    results = []
+    for batch_size in [int(size) for size in args.batch_sizes.split(',')]:
+        result = run_batch_size(connect, batch_size, args.messages, args.producers)
+        results.append(result)
+        print(f"batch={result['batch_size']:>4} messages={result['messages']:>6} "
+              f"msg/s={result['messages_per_sec']:>8} avg_batch={result['avg_batch_size']}")
+        if not args.rabbitmq_host:
+            while not broker.queue.empty():
+                broker.queue.get_nowait()
+    if args.rabbitmq_host:
+        connection = connect()
+        connection.channel().queue_delete(queue=BENCHMARK_QUEUE)
+        connection.close()
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+import json
+import time
+import argparse
+import statistics
+from threading import Thread, Barrier
+
+from support import FakeBroker, BenchmarkGateway, percentile
+
+def run_level(gateway, writers, requests_per_writer):
+    latencies = []
+    errors = []
+    barrier = Barrier(writers)
+
+    def writer(index):
+        client = gateway.app.test_client()
+        barrier.wait()
+        for i in range(requests_per_writer):
+            payload = {'naziv': f'Bench {index}-{i}', 'email': f'bench{index}.{i}@test.ba'}
+            start = time.perf_counter()
+            response = client.post('/api/klijenti', json=payload, headers={'X-Tenant-API-Key': 'benchmark'})
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+
+    threads = [Thread(target=writer, args=(i,)) for i in range(writers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {
+        'writers': writers,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 2)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='create_client round-trip latency through send_message_and_wait')
+    parser.add_argument('--writers', default='1,50,500')
+    parser.add_argument('--requests', type=int, default=2000, help='total requests per concurrency level')
+    parser.add_argument('--broker-workers', type=int, default=4)
+    parser.add_argument('--handler-latency-ms', type=float, default=1.0)
+    args = parser.parse_args()
+    broker = FakeBroker(args.broker_workers, args.handler_latency_ms / 1000)
+    gateway = BenchmarkGateway(broker)
+    results = []
+    for writers in [int(w) for w in args.writers.split(',')]:
+        per_writer = max(1, args.requests // writers)
+        result = run_level(gateway, writers, per_writer)
+        results.append(result)
+        print(f"writers={result['writers']:>4} requests={result['requests']:>5} "
+              f"p50={result['p50_ms']:>8} ms p99={result['p99_ms']:>8} ms "
+              f"rps={result['throughput_rps']:>8} errors={result['errors']}")
+    print(json.dumps({'rpc_latency': gateway.rpc_latency.snapshot(), 'results': results}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+import os
+import sys
+import json
+import time
+import uuid
+import tempfile
+import http.server
+from queue import Queue
+from threading import Thread, Lock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault('TRACE_LOG_PATH', os.path.join(tempfile.gettempdir(), 'epos-benchmark-traces.db'))
+
+from app import APIGateway
+
+class FakeChannel:
+    is_closed = False
+
+    def __init__(self, broker):
+        self.broker = broker
+        self.uncommitted = []
+
+    def queue_declare(self, queue, durable=False):
+        pass
+
+    def tx_select(self):
+        pass
+
+    def basic_publish(self, exchange, routing_key, body, properties=None):
+        self.uncommitted.append((properties.correlation_id, body))
+
+    def tx_commit(self):
+        time.sleep(self.broker.commit_latency)
+        for item in self.uncommitted:
+            self.broker.queue.put(item)
+        self.uncommitted = []
+
+class FakeConnection:
+    is_closed = False
+
+    def __init__(self, broker):
+        self.broker = broker
+
+    def channel(self):
+        return FakeChannel(self.broker)
+
+    def process_data_events(self, time_limit=0):
+        pass
+
+    def close(self):
+        self.is_closed = True
+
+class FakeBroker:
+    REPLY_IDS = {
+        'create_client': 'klijent_id',
+        'create_invoice': 'faktura_id',
+        'create_expense': 'trosak_id'
+    }
+
+    def __init__(self, workers=4, handler_latency=0.001, commit_latency=0.0005):
+        self.handler_latency = handler_latency
+        self.commit_latency = commit_latency
+        self.queue = Queue()
+        self.gateway = None
+        for _ in range(workers):
+            Thread(target=self.work, daemon=True).start()
+
+    def work(self):
+        while True:
+            correlation_id, body = self.queue.get()
+            if self.gateway is None:
+                continue
+            time.sleep(self.handler_latency)
+            message_type = json.loads(body).get('type')
+            reply = {self.REPLY_IDS.get(message_type, 'klijent_id'): str(uuid.uuid4())}
+            self.gateway.complete_request(correlation_id, reply)
+
+def build_payload(size_bytes):
+    rows = []
+    size = 2
+    while size < size_bytes:
+        row = {
+            'id': str(uuid.uuid4()),
+            'naziv': f'Benchmark {len(rows)}',
+            'email': f'benchmark{len(rows)}@test.ba',
+            'iznos': round(len(rows) * 1.37, 2),
+            'datum_kreiranja': '2024-05-01T10:00:00'
+        }
+        rows.append(row)
+        size += len(json.dumps(row)) + 2
+    return json.dumps(rows).encode()
+
+class FakeUpstream:
+    def __init__(self, latency=0.0, payload=None, payload_bytes=2048):
+        self.latency = latency
+        self.payload = payload if payload is not None else build_payload(payload_bytes)
+        self.requests = 0
+        self.lock = Lock()
+        upstream = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with upstream.lock:
+                    upstream.requests += 1
+                if upstream.latency:
+                    time.sleep(upstream.latency)
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(upstream.payload)))
+                self.end_headers()
+                self.wfile.write(upstream.payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def start_fake_upstreams(latency=0.0, payload_bytes=2048, replicas=1):
+    return {name: [FakeUpstream(latency, payload_bytes=payload_bytes) for _ in range(replicas)]
+            for name in ('klijent-service', 'faktura-service', 'trosak-service')}
+
+class BenchmarkGateway(APIGateway):
+    def __init__(self, broker=None, upstreams=None):
+        self.broker = broker or FakeBroker()
+        self.fake_upstreams = upstreams or {}
+        super().__init__(redis_host=os.getenv('REDIS_HOST', 'localhost'))
+        self.broker.gateway = self
+
+    def upstream_urls(self):
+        urls = super().upstream_urls()
+        for name, upstreams in self.fake_upstreams.items():
+            upstreams = upstreams if isinstance(upstreams, list) else [upstreams]
+            urls[name] = [upstream.url for upstream in upstreams]
+        return urls
+
+    def lookup_tenant(self, api_key):
+        return {'id': f'tenant-{api_key}', 'naziv': f'Benchmark {api_key}', 'status': 'active'}
+
+    def connect_rabbitmq(self):
+        return FakeConnection(self.broker)
+
+    def setup_rabbitmq(self):
+        self.connection = self.connect_rabbitmq()
+
+    def start_response_consumer(self):
+        pass
+
+    def start_tenant_event_consumer(self):
+        pass
+
+def percentile(values, q):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))
+    return ordered[index]
+
+def latency_summary(latencies, elapsed):
+    if not latencies:
+        return {'requests': 0}
+    return {
+        'requests': len(latencies),
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'max_ms': round(max(latencies) * 1000, 2)
+    }
+
+class LoadGenerator:
+    def __init__(self, target_rps, duration, workers=64):
+        self.target_rps = target_rps
+        self.duration = duration
+        self.workers = workers
+        self.queue = Queue()
+        self.latencies = {}
+        self.errors = {}
+        self.lock = Lock()
+
+    def record(self, kind, latency, ok):
+        with self.lock:
+            self.latencies.setdefault(kind, []).append(latency)
+            if not ok:
+                self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def work(self, make_client):
+        client = make_client()
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            scheduled, kind, operation = item
+            try:
+                ok = operation(client)
+            except Exception as e:
+                print(f"{kind} request failed: {e}")
+                ok = False
+            self.record(kind, time.perf_counter() - scheduled, ok)
+
+    def run(self, next_operation, make_client):
+        threads = [Thread(target=self.work, args=(make_client,), daemon=True) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        interval = 1.0 / self.target_rps
+        total = int(self.target_rps * self.duration)
+        start = time.perf_counter()
+        for index in range(total):
+            scheduled = start + index * interval
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            kind, operation = next_operation(index)
+            self.queue.put((scheduled, kind, operation))
+        for _ in threads:
+            self.queue.put(None)
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        results = {}
+        for kind, latencies in sorted(self.latencies.items()):
+            results[kind] = latency_summary(latencies, elapsed)
+            results[kind]['errors'] = self.errors.get(kind, 0)
+        all_latencies = [latency for latencies in self.latencies.values() for latency in latencies]
+        results['total'] = latency_summary(all_latencies, elapsed)
+        results['total']['errors'] = sum(self.errors.values())
+        return {
+            'target_rps': self.target_rps,
+            'achieved_rps': round(len(all_latencies) / elapsed, 1),
+            'elapsed_s': round(elapsed, 3),
+            'results': results
+        }
@@ -1,37 +1,91 @@
 #!/usr/bin/env python3
 import sqlite3
 import json
+import csv
+import io
 import uuid
 import os
 import requests
 from datetime import datetime
-from typing import Dict, List, Optional
+from threading import Lock
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from dataclasses import dataclass
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from shared.instrumentation import connect_db, instrument_app
+from shared.tenant_context import TENANT_CONTEXT_HEADER, SERVICE_SIGNATURE_HEADER, TenantCache, \
+    sign_service_request, verify_tenant_context
+from shared.tenant_events import start_tenant_event_consumer
+from shared.rabbitmq import connect_rabbitmq
+from shared.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor, next_cursor, page_limit
+from shared.export import export_format, export_response
+from shared.metering import UsageMeter
+from shared.http import enable_conditional_responses
+
+try:
+    import pika
+except ImportError:
+    print("Warning: pika not installed, tenant events disabled")
+    pika = None
 
 class TenantIntegration:
-    def __init__(self, tenant_service_url='http://localhost:5004'):
+    def __init__(self, tenant_service_url='http://localhost:5004', cache_ttl: int = 60,
+                 negative_cache_ttl: int = 10, timeout: float = 2.0, usage_batch_size: int = 500,
+                 usage_flush_interval: float = 5.0, metering: bool = True):
         self.tenant_service_url = tenant_service_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.cache = TenantCache(cache_ttl, negative_cache_ttl)
+        self.usage_meter = UsageMeter(self.send_api_usage, usage_batch_size, usage_flush_interval) if metering else None
 
     def validate_tenant(self, api_key: str) -> Optional[Dict]:
+        found, tenant = self.cache.get(api_key)
+        if found:
+            return tenant
         try:
-            response = requests.get(
+            response = self.session.get(
                 f'{self.tenant_service_url}/api/tenant/info',
-                headers={'X-Tenant-API-Key': api_key}
+                headers={'X-Tenant-API-Key': api_key},
+                timeout=self.timeout
             )
             if response.status_code == 200:
-                return response.json()
+                tenant = response.json()
+                self.cache.set(api_key, tenant)
+                return tenant
+            if response.status_code in (401, 403, 404):
+                self.cache.set(api_key, None)
             return None
         except Exception as e:
             print(f"Error validating tenant: {e}")
             return None
 
+    def start_event_consumer(self, rabbitmq_host: str, on_event=None):
+        if not pika:
+            return
+        start_tenant_event_consumer(
+            lambda: connect_rabbitmq(rabbitmq_host),
+            on_event or self.cache.handle_event
+        )
+
     def record_api_usage(self, tenant_id: str, endpoint: str, method: str, cost: float):
-        try:
-            print(f"API Usage: {tenant_id} - {method} {endpoint} - Cost: {cost} KM")
-        except Exception as e:
-            print(f"Error recording API usage: {e}")
+        if self.usage_meter:
+            self.usage_meter.record(tenant_id, endpoint, method, cost)
+
+    def send_api_usage(self, events: List[Dict]):
+        body = json.dumps({'events': events}).encode()
+        headers = {'Content-Type': 'application/json'}
+        signature = sign_service_request(body)
+        if signature:
+            headers[SERVICE_SIGNATURE_HEADER] = signature
+        response = self.session.post(
+            f'{self.tenant_service_url}/api/usage/batch',
+            data=body,
+            headers=headers,
+            timeout=self.timeout
+        )
+        response.raise_for_status()
 
 @dataclass
 class Klijent:
@@ -53,7 +107,7 @@ class TenantDatabaseManager:
         self.init_database()
 
     def init_database(self):
-        conn = sqlite3.connect(self.db_path)
+        conn = connect_db(self.db_path)
         cursor = conn.cursor()
         cursor.execute('''
                        CREATE TABLE IF NOT EXISTS klijenti
@@ -91,6 +145,11 @@ class TenantDatabaseManager:
                        )
                            )
                        ''')
+        cursor.execute('''
+                       CREATE INDEX IF NOT EXISTS idx_klijenti_tenant_naziv
+                           ON klijenti (tenant_id, naziv, id) WHERE aktivan = 1
+                       ''')
+        self.init_search_index(cursor)
         cursor.execute("SELECT COUNT(*) FROM klijenti")
         existing_clients = cursor.fetchone()[0]
         print(f"Existing clients in database: {existing_clients}")
@@ -101,6 +160,55 @@ class TenantDatabaseManager:
         conn.close()
         print(f"Client database initialized at: {self.db_path}")
 
+    def init_search_index(self, cursor):
+        self.fts_enabled = False
+        try:
+            cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'klijenti_fts'")
+            exists = cursor.fetchone()[0] > 0
+            cursor.execute('''
+                           CREATE VIRTUAL TABLE IF NOT EXISTS klijenti_fts USING fts5(
+                               naziv, email, telefon, adresa,
+                               content='klijenti', content_rowid='rowid',
+                               tokenize='unicode61 remove_diacritics 2'
+                           )
+                           ''')
+            cursor.execute('''
+                           CREATE TRIGGER IF NOT EXISTS klijenti_fts_insert AFTER INSERT ON klijenti BEGIN
+                               INSERT INTO klijenti_fts(rowid, naziv, email, telefon, adresa)
+                               VALUES (new.rowid, new.naziv, new.email, new.telefon, new.adresa);
+                           END
+                           ''')
+            cursor.execute('''
+                           CREATE TRIGGER IF NOT EXISTS klijenti_fts_delete AFTER DELETE ON klijenti BEGIN
+                               INSERT INTO klijenti_fts(klijenti_fts, rowid, naziv, email, telefon, adresa)
+                               VALUES ('delete', old.rowid, old.naziv, old.email, old.telefon, old.adresa);
+                           END
+                           ''')
+            cursor.execute('''
+                           CREATE TRIGGER IF NOT EXISTS klijenti_fts_update AFTER UPDATE OF naziv, email, telefon, adresa ON klijenti BEGIN
+                               INSERT INTO klijenti_fts(klijenti_fts, rowid, naziv, email, telefon, adresa)
+                               VALUES ('delete', old.rowid, old.naziv, old.email, old.telefon, old.adresa);
+                               INSERT INTO klijenti_fts(rowid, naziv, email, telefon, adresa)
+                               VALUES (new.rowid, new.naziv, new.email, new.telefon, new.adresa);
+                           END
+                           ''')
+            if not exists:
+                cursor.execute("INSERT INTO klijenti_fts(klijenti_fts) VALUES ('rebuild')")
+            self.fts_enabled = True
+        except sqlite3.OperationalError as e:
+            print(f"Full-text search unavailable, falling back to LIKE: {e}")
+
+    def vacuum(self):
+        conn = connect_db(self.db_path)
+        try:
+            conn.execute("VACUUM")
+            if self.fts_enabled:
+                conn.execute("INSERT INTO klijenti_fts(klijenti_fts) VALUES ('rebuild')")
+                conn.commit()
+        finally:
+            conn.close()
+        print(f"Database vacuumed and search index rebuilt: {self.db_path}")
+
     def create_demo_clients(self, cursor):
         try:
             demo_tenant_id = "demo-tenant-12345"
@@ -144,7 +252,7 @@ class TenantDatabaseManager:
 
     def execute_query(self, query: str, params=None):
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = connect_db(self.db_path)
             cursor = conn.cursor()
             if params:
                 cursor.execute(query, params)
@@ -168,6 +276,8 @@ class KlijentService:
     def __init__(self, db_manager: TenantDatabaseManager, tenant_integration: TenantIntegration):
         self.db = db_manager
         self.tenant_integration = tenant_integration
+        self.provisioned_tenants = set()
+        self.provision_lock = Lock()
 
     def kreiraj_klijenta(self, tenant_id: str, naziv: str, email: str, telefon: str, adresa: str) -> str:
         klijent_id = str(uuid.uuid4())
@@ -189,6 +299,75 @@ class KlijentService:
         else:
             raise Exception("Greška pri kreiranju klijenta")
 
+    def uvezi_klijente(self, tenant_id: str, redovi: Iterable[Tuple[int, Any]], chunk_size: int = 1000,
+                       max_gresaka: int = 1000) -> Dict:
+        conn = connect_db(self.db.db_path)
+        uvezeno = 0
+        odbijeno = 0
+        greske = []
+
+        def odbij(red, poruka):
+            nonlocal odbijeno
+            odbijeno += 1
+            if len(greske) < max_gresaka:
+                greske.append({'red': red, 'error': poruka})
+
+        try:
+            conn.execute("CREATE TEMP TABLE uvoz_klijenti AS SELECT id, tenant_id, naziv, email, telefon, adresa, "
+                         "datum_kreiranja, aktivan FROM klijenti WHERE 0")
+            emails = {row[0] for row in conn.execute("SELECT email FROM klijenti WHERE tenant_id = ?", (tenant_id,))}
+            datum = datetime.now().isoformat()
+            chunk = []
+            for red, podaci in redovi:
+                if isinstance(podaci, str):
+                    odbij(red, podaci)
+                    continue
+                naziv = str(podaci.get('naziv') or '').strip()
+                email = str(podaci.get('email') or '').strip()
+                if not naziv or not email:
+                    odbij(red, 'Nedostaju obavezni podaci (naziv, email)')
+                    continue
+                if email in emails:
+                    odbij(red, f"Klijent sa email-om {email} već postoji")
+                    continue
+                emails.add(email)
+                chunk.append((red, (str(uuid.uuid4()), tenant_id, naziv, email, str(podaci.get('telefon') or ''),
+                                    str(podaci.get('adresa') or ''), datum, 1)))
+                if len(chunk) >= chunk_size:
+                    uvezeno += self.upisi_uvoz(conn, chunk, odbij)
+                    chunk = []
+            if chunk:
+                uvezeno += self.upisi_uvoz(conn, chunk, odbij)
+        finally:
+            conn.close()
+        if uvezeno:
+            self.tenant_integration.record_api_usage(tenant_id, '/api/klijenti/import', 'POST', 0.5 * uvezeno)
+        print(f"Uvezeno {uvezeno} klijenata za tenant {tenant_id}, odbijeno {odbijeno}")
+        return {'status': 'success', 'uvezeno': uvezeno, 'odbijeno': odbijeno, 'greske': greske,
+                'greske_skracene': odbijeno > len(greske)}
+
+    @staticmethod
+    def upisi_uvoz(conn, chunk: List[Tuple[int, tuple]], odbij) -> int:
+        kolone = "id, tenant_id, naziv, email, telefon, adresa, datum_kreiranja, aktivan"
+        sql = f"INSERT INTO klijenti ({kolone}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+        try:
+            with conn:
+                conn.cursor().executemany(f"INSERT INTO uvoz_klijenti ({kolone}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                          [values for _, values in chunk])
+                conn.execute(f"INSERT INTO klijenti ({kolone}) SELECT {kolone} FROM uvoz_klijenti")
+                conn.execute("DELETE FROM uvoz_klijenti")
+            return len(chunk)
+        except sqlite3.IntegrityError:
+            upisano = 0
+            for red, values in chunk:
+                try:
+                    with conn:
+                        conn.execute(sql, values)
+                    upisano += 1
+                except sqlite3.IntegrityError as e:
+                    odbij(red, f"Klijent sa email-om {values[3]} već postoji" if 'UNIQUE' in str(e) else str(e))
+            return upisano
+
     def azuriraj_klijenta(self, tenant_id: str, klijent_id: str, naziv: str = None, email: str = None,
                           telefon: str = None, adresa: str = None) -> bool:
         try:
@@ -246,12 +425,59 @@ class KlijentService:
             return dict(zip(cols, result[0]))
         return None
 
-    def dobij_sve_klijente(self, tenant_id: str) -> List[Dict]:
-        print(f"🔍 Searching for clients for tenant: {tenant_id}")
-        result = self.db.execute_query(
-            "SELECT id, naziv, email, telefon, adresa, datum_kreiranja, aktivan FROM klijenti WHERE tenant_id = ? AND aktivan = 1 ORDER BY naziv",
-            (tenant_id,)
+    @staticmethod
+    def fts_upit(q: str) -> str:
+        terms = [term.replace('"', '""') for term in q.split() if any(c.isalnum() for c in term)]
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def pretrazi_klijente(self, tenant_id: str, q: str, limit: int = 20, offset: int = 0) -> List[Dict]:
+        cols = ['id', 'naziv', 'email', 'telefon', 'adresa', 'datum_kreiranja', 'aktivan']
+        upit = self.fts_upit(q)
+        if not upit:
+            return []
+        if self.db.fts_enabled:
+            result = self.db.execute_query(
+                "SELECT k.id, k.naziv, k.email, k.telefon, k.adresa, k.datum_kreiranja, k.aktivan "
+                "FROM klijenti_fts JOIN klijenti k ON k.rowid = klijenti_fts.rowid "
+                "WHERE klijenti_fts MATCH ? AND k.tenant_id = ? AND k.aktivan = 1 "
+                "ORDER BY bm25(klijenti_fts, 10.0, 5.0, 2.0, 1.0) LIMIT ? OFFSET ?",
+                (upit, tenant_id, limit, offset)
+            )
+        else:
+            pattern = f"%{q.strip()}%"
+            result = self.db.execute_query(
+                "SELECT id, naziv, email, telefon, adresa, datum_kreiranja, aktivan FROM klijenti "
+                "WHERE tenant_id = ? AND aktivan = 1 AND (naziv LIKE ? OR email LIKE ? OR telefon LIKE ? OR adresa LIKE ?) "
+                "ORDER BY naziv, id LIMIT ? OFFSET ?",
+                (tenant_id, pattern, pattern, pattern, pattern, limit, offset)
+            )
+        self.tenant_integration.record_api_usage(tenant_id, '/api/klijenti/search', 'GET', 0.01)
+        return [dict(zip(cols, row)) for row in result]
+
+    def izvezi_klijente(self, tenant_id: str, format_name: str):
+        cols = ['id', 'naziv', 'email', 'telefon', 'adresa', 'datum_kreiranja', 'aktivan']
+        self.tenant_integration.record_api_usage(tenant_id, '/api/klijenti/export', 'GET', 0.01)
+        return export_response(
+            self.db.db_path,
+            "SELECT id, naziv, email, telefon, adresa, datum_kreiranja, aktivan FROM klijenti "
+            "WHERE tenant_id = ? AND aktivan = 1 ORDER BY naziv, id",
+            (tenant_id,), cols, format_name, 'klijenti'
         )
+
+    def dobij_sve_klijente(self, tenant_id: str, limit: int = 100, after: Optional[List] = None) -> List[Dict]:
+        print(f"🔍 Searching for clients for tenant: {tenant_id}")
+        if after:
+            result = self.db.execute_query(
+                "SELECT id, naziv, email, telefon, adresa, datum_kreiranja, aktivan FROM klijenti "
+                "WHERE tenant_id = ? AND aktivan = 1 AND (naziv, id) > (?, ?) ORDER BY naziv, id LIMIT ?",
+                (tenant_id, after[0], after[1], limit)
+            )
+        else:
+            result = self.db.execute_query(
+                "SELECT id, naziv, email, telefon, adresa, datum_kreiranja, aktivan FROM klijenti "
+                "WHERE tenant_id = ? AND aktivan = 1 ORDER BY naziv, id LIMIT ?",
+                (tenant_id, limit)
+            )
         print(f"🔍 Raw database result: {result}")
         cols = ['id', 'naziv', 'email', 'telefon', 'adresa', 'datum_kreiranja', 'aktivan']
         klijenti = [dict(zip(cols, row)) for row in result]
@@ -260,6 +486,15 @@ class KlijentService:
         return klijenti
 
     def ensure_test_data_for_tenant(self, tenant_id: str):
+        if tenant_id in self.provisioned_tenants:
+            return
+        with self.provision_lock:
+            if tenant_id in self.provisioned_tenants:
+                return
+            self.provision_test_data(tenant_id)
+            self.provisioned_tenants.add(tenant_id)
+
+    def provision_test_data(self, tenant_id: str):
         print(f"🔧 Checking test data for tenant: {tenant_id}")
         existing = self.db.execute_query(
             "SELECT COUNT(*) FROM klijenti WHERE tenant_id = ? AND aktivan = 1",
@@ -284,16 +519,33 @@ class KlijentService:
                     print(f"  ❌ Error creating {naziv}: {e}")
             print(f"✅ Created {created_count} test clients for tenant {tenant_id}")
 
+KLIJENTI_PAGE_SIZE = int(os.getenv('KLIJENTI_PAGE_SIZE', '100'))
+KLIJENTI_MAX_PAGE_SIZE = int(os.getenv('KLIJENTI_MAX_PAGE_SIZE', '500'))
+KLIJENTI_SEARCH_PAGE_SIZE = int(os.getenv('KLIJENTI_SEARCH_PAGE_SIZE', '20'))
+UVOZ_CHUNK_SIZE = int(os.getenv('UVOZ_CHUNK_SIZE', '5000'))
+UVOZ_MAX_GRESAKA = int(os.getenv('UVOZ_MAX_GRESAKA', '1000'))
+UVOZ_FORMATI = {'text/csv': 'csv', 'application/x-ndjson': 'ndjson', 'application/jsonl': 'ndjson'}
+
 app = Flask(__name__)
+instrument_app(app, 'client-service')
 #Problem solucija!!!
 CORS(app,
      origins=['http://localhost:5000', 'http://127.0.0.1:5000'],
      allow_headers=['Content-Type', 'Authorization', 'X-Tenant-API-Key'],
+     expose_headers=[NEXT_CURSOR_HEADER],
      methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
      supports_credentials=True)
 
-db_manager = TenantDatabaseManager()
-tenant_integration = TenantIntegration()
+db_manager = TenantDatabaseManager(os.getenv('DB_PATH', '../db/epos.db'))
+tenant_integration = TenantIntegration(
+    os.getenv('TENANT_SERVICE_URL', 'http://localhost:5004'),
+    int(os.getenv('TENANT_CACHE_TTL', '60')),
+    int(os.getenv('TENANT_NEGATIVE_CACHE_TTL', '10')),
+    float(os.getenv('TENANT_SERVICE_TIMEOUT', '2')),
+    int(os.getenv('METERING_BATCH_SIZE', '500')),
+    float(os.getenv('METERING_FLUSH_INTERVAL', '5')),
+    os.getenv('METERING_ENABLED', '1') != '0'
+)
 klijent_service = KlijentService(db_manager, tenant_integration)
 
 @app.after_request
@@ -304,6 +556,7 @@ def after_request(response):
         response.headers['Access-Control-Allow-Credentials'] = 'true'
         response.headers['Access-Control-Allow-Headers'] = 'Content-Type,Authorization,X-Tenant-API-Key'
         response.headers['Access-Control-Allow-Methods'] = 'GET,POST,PUT,DELETE,OPTIONS'
+        response.headers['Access-Control-Expose-Headers'] = NEXT_CURSOR_HEADER
     return response
 
 @app.before_request
@@ -324,6 +577,7 @@ def after_request(response):
     response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,X-Tenant-API-Key')
     response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
     response.headers.add('Access-Control-Allow-Credentials', 'true')
+    response.headers.add('Access-Control-Expose-Headers', NEXT_CURSOR_HEADER)
     return response
 
 @app.route('/api/klijenti', methods=['OPTIONS'])
@@ -337,13 +591,14 @@ def handle_options(klijent_id=None):
 
 @app.before_request
 def authenticate_tenant():
-    if request.endpoint == 'health':
+    if request.endpoint in ['health', 'metrics', 'traces']:
         return
     api_key = request.headers.get('X-Tenant-API-Key')
     if not api_key:
         print("❌ Missing X-Tenant-API-Key header")
         return jsonify({'error': 'Missing X-Tenant-API-Key header'}), 401
-    tenant_info = tenant_integration.validate_tenant(api_key)
+    tenant_info = verify_tenant_context(request.headers.get(TENANT_CONTEXT_HEADER), api_key) \
+        or tenant_integration.validate_tenant(api_key)
     if not tenant_info:
         print(f"❌ Invalid tenant for API key: {api_key[:8]}...")
         return jsonify({'error': 'Invalid or inactive tenant'}), 401
@@ -351,6 +606,8 @@ def authenticate_tenant():
     print(f"✅ Authenticated tenant: {tenant_info['naziv']} ({tenant_info['id']})")
     klijent_service.ensure_test_data_for_tenant(tenant_info['id'])
 
+enable_conditional_responses(app)
+
 @app.route('/api/klijenti', methods=['GET', 'POST'])
 def klijenti_api():
     try:
@@ -367,9 +624,98 @@ def klijenti_api():
             )
             return jsonify({'id': klijent_id, 'status': 'success'})
         else:
-            klijenti = klijent_service.dobij_sve_klijente(tenant_id)
+            limit = page_limit(request.args.get('limit'), KLIJENTI_PAGE_SIZE, KLIJENTI_MAX_PAGE_SIZE)
+            cursor = request.args.get('cursor')
+            after = decode_cursor(cursor, 2) if cursor else None
+            klijenti = klijent_service.dobij_sve_klijente(tenant_id, limit, after)
             print(f"📤 Returning {len(klijenti)} clients for tenant {tenant_id}")
-            return jsonify(klijenti)
+            response = jsonify(klijenti)
+            cursor = next_cursor(klijenti, limit)
+            if cursor:
+                response.headers[NEXT_CURSOR_HEADER] = cursor
+            return response
+    except ValueError as e:
+        print(f"❌ Validation Error: {e}")
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"❌ API Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': 'Greška na serveru'}), 500
+
+def citaj_linije(stream, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    ostatak = b''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        linije = (ostatak + chunk).split(b'\n')
+        ostatak = linije.pop()
+        yield from linije
+    if ostatak:
+        yield ostatak
+
+def citaj_ndjson(stream) -> Iterator[Tuple[int, Any]]:
+    for red, line in enumerate(citaj_linije(stream), 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            podaci = json.loads(line)
+        except ValueError:
+            yield red, 'Neispravan JSON'
+            continue
+        yield red, podaci if isinstance(podaci, dict) else 'Red mora biti JSON objekat'
+
+def citaj_csv(stream) -> Iterator[Tuple[int, Any]]:
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    try:
+        for podaci in reader:
+            yield reader.line_num, podaci
+    except (csv.Error, UnicodeDecodeError) as e:
+        yield reader.line_num + 1, f'Neispravan CSV: {e}'
+
+@app.route('/api/klijenti/import', methods=['POST'])
+def uvoz_klijenata_api():
+    try:
+        tenant_id = request.tenant['id']
+        format_uvoza = request.args.get('format') or UVOZ_FORMATI.get(request.mimetype)
+        if format_uvoza not in ('csv', 'ndjson'):
+            return jsonify({'error': 'Nepodržan format uvoza (csv, ndjson)'}), 400
+        redovi = citaj_csv(request.stream) if format_uvoza == 'csv' else citaj_ndjson(request.stream)
+        return jsonify(klijent_service.uvezi_klijente(tenant_id, redovi, UVOZ_CHUNK_SIZE, UVOZ_MAX_GRESAKA))
+    except Exception as e:
+        print(f"❌ API Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': 'Greška na serveru'}), 500
+
+@app.route('/api/klijenti/export', methods=['GET'])
+def izvoz_klijenata_api():
+    try:
+        return klijent_service.izvezi_klijente(request.tenant['id'], export_format(request.args.get('format')))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/klijenti/search', methods=['GET'])
+def pretraga_klijenata_api():
+    try:
+        tenant_id = request.tenant['id']
+        q = request.args.get('q', '').strip()
+        if not q:
+            return jsonify({'error': 'Nedostaje parametar q'}), 400
+        limit = page_limit(request.args.get('limit'), KLIJENTI_SEARCH_PAGE_SIZE, KLIJENTI_MAX_PAGE_SIZE)
+        cursor = request.args.get('cursor')
+        offset = decode_cursor(cursor, 1)[0] if cursor else 0
+        if not isinstance(offset, int) or offset < 0:
+            raise ValueError('Neispravan kursor')
+        klijenti = klijent_service.pretrazi_klijente(tenant_id, q, limit, offset)
+        print(f"📤 Returning {len(klijenti)} search results for tenant {tenant_id}")
+        cursor = encode_cursor(offset + limit) if len(klijenti) == limit else None
+        response = jsonify({'klijenti': klijenti, 'next_cursor': cursor})
+        if cursor:
+            response.headers[NEXT_CURSOR_HEADER] = cursor
+        return response
     except ValueError as e:
         print(f"❌ Validation Error: {e}")
         return jsonify({'error': str(e)}), 400
@@ -410,7 +756,8 @@ def klijent_api(klijent_id):
 
 @app.route('/health')
 def health():
-    return jsonify({'status': 'ok', 'service': 'klijent-service-multitenant'})
+    return jsonify({'status': 'ok', 'service': 'klijent-service-multitenant',
+                    'metering': tenant_integration.usage_meter.stats() if tenant_integration.usage_meter else None})
 
 @app.route('/debug/database')
 def debug_database():
@@ -426,6 +773,16 @@ def debug_database():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def handle_tenant_event(event: Dict):
+    tenant_integration.cache.handle_event(event)
+    tenant_id = (event.get('data') or {}).get('tenant_id')
+    if event.get('type') == 'tenant_activated' and tenant_id:
+        klijent_service.ensure_test_data_for_tenant(tenant_id)
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'vacuum':
+        db_manager.vacuum()
+        sys.exit(0)
     print("🚀 Pokretanje Multitenant Klijent mikroservisa na portu 5001...")
+    tenant_integration.start_event_consumer(os.getenv('RABBITMQ_HOST', 'localhost'), handle_tenant_event)
     app.run(host='0.0.0.0', port=5001, debug=True)
\ No newline at end of file
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import sqlite3
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+BOOTSTRAP_DIR = tempfile.mkdtemp(prefix='search_fts_')
+os.environ['DB_PATH'] = os.path.join(BOOTSTRAP_DIR, 'epos.db')
+os.environ['METERING_ENABLED'] = '0'
+os.environ.setdefault('TRACE_LOG_PATH', '')
+
+from app import TenantDatabaseManager, KlijentService, TenantIntegration
+
+PREFIKSI = ['Atlantik', 'Tech', 'Green', 'Digital', 'Zdravstveni', 'Agro', 'Mont', 'Elektro', 'Drina', 'Sana',
+            'Kozara', 'Vrbas', 'Medi', 'Auto', 'Gradnja', 'Info', 'Trans', 'Eko', 'Pekara', 'Mlin']
+SUFIKSI = ['d.o.o.', 'a.d.', 'Solutions', 'Centar', 'Trade', 'Servis', 'Group', 'Ltd', 'Promet', 'Komerc']
+GRADOVI = ['Banja Luka', 'Sarajevo', 'Mostar', 'Tuzla', 'Prijedor', 'Bijeljina', 'Doboj', 'Trebinje', 'Zenica',
+           'Bihać', 'Gradiška', 'Zvornik']
+ULICE = ['Kralja Petra', 'Vuka Karadžića', 'Njegoševa', 'Cara Dušana', 'Jevrejska', 'Gundulićeva', 'Kninska']
+
+def generate_rows(count, tenants, seed):
+    rng = random.Random(seed)
+    for i in range(count):
+        naziv = f"{rng.choice(PREFIKSI)}{rng.choice(PREFIKSI).lower()} {rng.choice(SUFIKSI)} {i}"
+        yield (
+            str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            tenants[i % len(tenants)],
+            naziv,
+            f"kontakt{i}@{naziv.split()[0].lower()}.ba",
+            f"+387 {rng.randint(30, 66)} {rng.randint(100, 999)} {rng.randint(100, 999)}",
+            f"{rng.choice(ULICE)} {rng.randint(1, 200)}, {rng.choice(GRADOVI)}",
+            '2024-05-01T10:00:00',
+            1
+        )
+
+def load(db, rows, tenants, seed):
+    conn = sqlite3.connect(db.db_path)
+    start = time.perf_counter()
+    conn.executemany(
+        "INSERT INTO klijenti (id, tenant_id, naziv, email, telefon, adresa, datum_kreiranja, aktivan) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", generate_rows(rows, tenants, seed)
+    )
+    conn.commit()
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return elapsed
+
+def measure(service, tenant_id, q, limit, repeats):
+    timings = []
+    found = 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        found = len(service.pretrazi_klijente(tenant_id, q, limit))
+        timings.append(time.perf_counter() - start)
+    return {
+        'best_ms': round(min(timings) * 1000, 2),
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 2),
+        'results': found
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='FTS5 client search against LIKE scans')
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--tenants', type=int, default=1)
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--query', action='append', dest='queries')
+    args = parser.parse_args()
+    queries = args.queries or ['Drinamont', 'kontakt4242', 'Trebinje', '+387 51 123', 'Vuka Karadžića 17', 'xyz']
+    tenants = [f'benchmark-tenant-{i}' for i in range(args.tenants)]
+    with tempfile.TemporaryDirectory() as tmp:
+        db = TenantDatabaseManager(os.path.join(tmp, 'epos.db'))
+        service = KlijentService(db, TenantIntegration(metering=False))
+        load_seconds = load(db, args.rows, tenants, args.seed)
+        results = []
+        for q in queries:
+            db.fts_enabled = True
+            fts = measure(service, tenants[0], q, args.limit, args.repeats)
+            db.fts_enabled = False
+            like = measure(service, tenants[0], q, args.limit, args.repeats)
+            results.append({'query': q, 'fts': fts, 'like': like})
+        db_bytes = os.path.getsize(db.db_path)
+    print(f"rows={args.rows} tenants={args.tenants} load={load_seconds:.1f}s db={db_bytes / 1024 / 1024:.0f} MB")
+    for result in results:
+        print(f"{result['query']!r:<22} fts={result['fts']['best_ms']:>9} ms ({result['fts']['results']:>3}) "
+              f"like={result['like']['best_ms']:>9} ms ({result['like']['results']:>3})")
+    print(json.dumps({'rows': args.rows, 'tenants': args.tenants, 'load_seconds': round(load_seconds, 2),
+                      'db_bytes': db_bytes, 'results': results}, indent=2))
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        shutil.rmtree(BOOTSTRAP_DIR, ignore_errors=True)
@@ -1,5 +1,4 @@
 #!/usr/bin/env python3
-import sqlite3
 import json
 import uuid
 from datetime import datetime
@@ -8,6 +7,11 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 from dataclasses import dataclass
 import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from shared.instrumentation import connect_db, instrument_app
+from shared.export import export_format, export_response
+from shared.http import enable_conditional_responses
 
 @dataclass
 class Trosak:
@@ -27,7 +31,7 @@ class DatabaseManager:
         self.init_database()
 
     def init_database(self):
-        conn = sqlite3.connect(self.db_path)
+        conn = connect_db(self.db_path)
         cursor = conn.cursor()
         cursor.execute('''
                        CREATE TABLE IF NOT EXISTS troskovi
@@ -71,7 +75,7 @@ class DatabaseManager:
 
     def execute_query(self, query, params=None):
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = connect_db(self.db_path)
             cursor = conn.cursor()
             if params:
                 cursor.execute(query, params)
@@ -143,7 +147,7 @@ class TrosakService:
         params.append(trosak_id)
         query = f"UPDATE troskovi SET {', '.join(update_fields)} WHERE id = ?"
         try:
-            conn = sqlite3.connect(self.db.db_path)
+            conn = connect_db(self.db.db_path)
             cursor = conn.cursor()
             cursor.execute(query, params)
             success = cursor.rowcount > 0
@@ -157,7 +161,7 @@ class TrosakService:
 
     def obrisi_trosak(self, trosak_id: str) -> bool:
         try:
-            conn = sqlite3.connect(self.db.db_path)
+            conn = connect_db(self.db.db_path)
             cursor = conn.cursor()
             cursor.execute("DELETE FROM troskovi WHERE id = ?", (trosak_id,))
             success = cursor.rowcount > 0
@@ -176,10 +180,13 @@ class TrosakService:
             return dict(zip(cols, result[0]))
         return None
 
-    def dobij_troskove(self, kategorija: str = None, status: str = None,
-                       datum_od: str = None, datum_do: str = None) -> List[Dict]:
+    def upit_troskova(self, kategorija: str = None, status: str = None,
+                      datum_od: str = None, datum_do: str = None, povezano_sa: List[str] = None):
         query = "SELECT * FROM troskovi WHERE 1=1"
         params = []
+        if povezano_sa is not None:
+            query += f" AND povezano_sa IN ({', '.join('?' * len(povezano_sa))})"
+            params.extend(povezano_sa)
         if kategorija:
             query += " AND kategorija = ?"
             params.append(kategorija)
@@ -193,12 +200,25 @@ class TrosakService:
             query += " AND datum <= ?"
             params.append(datum_do)
         query += " ORDER BY datum DESC"
+        return query, params
+
+    def dobij_troskove(self, kategorija: str = None, status: str = None,
+                       datum_od: str = None, datum_do: str = None, povezano_sa: List[str] = None) -> List[Dict]:
+        if povezano_sa is not None and not povezano_sa:
+            return []
+        query, params = self.upit_troskova(kategorija, status, datum_od, datum_do, povezano_sa)
         result = self.db.execute_query(query, params if params else None)
         cols = ['id', 'naziv', 'kategorija', 'iznos', 'datum', 'opis', 'status', 'povezano_sa', 'datum_kreiranja']
         troskovi = [dict(zip(cols, row)) for row in result]
         print(f"Dobijeno {len(troskovi)} troškova")
         return troskovi
 
+    def izvezi_troskove(self, format_name: str, kategorija: str = None, status: str = None,
+                        datum_od: str = None, datum_do: str = None):
+        query, params = self.upit_troskova(kategorija, status, datum_od, datum_do)
+        cols = ['id', 'naziv', 'kategorija', 'iznos', 'datum', 'opis', 'status', 'povezano_sa', 'datum_kreiranja']
+        return export_response(self.db.db_path, query, params, cols, format_name, 'troskovi')
+
     def dobij_kategorije(self) -> List[Dict]:
         result = self.db.execute_query("SELECT * FROM kategorije_troskova ORDER BY naziv")
         cols = ['id', 'naziv', 'opis']
@@ -246,10 +266,13 @@ class TrosakService:
         return statistike
 
 app = Flask(__name__)
+instrument_app(app, 'expenses-service')
 CORS(app)
 db = DatabaseManager()
 trosak_service = TrosakService(db)
 
+enable_conditional_responses(app)
+
 @app.route('/api/troskovi', methods=['GET', 'POST'])
 def troskovi_api():
     try:
@@ -268,7 +291,9 @@ def troskovi_api():
             status = request.args.get('status')
             datum_od = request.args.get('datum_od')
             datum_do = request.args.get('datum_do')
-            troskovi = trosak_service.dobij_troskove(kategorija, status, datum_od, datum_do)
+            povezano_sa = request.args.get('povezano_sa')
+            povezano_sa = [v for v in povezano_sa.split(',') if v] if povezano_sa is not None else None
+            troskovi = trosak_service.dobij_troskove(kategorija, status, datum_od, datum_do, povezano_sa)
             return jsonify(troskovi)
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
@@ -276,6 +301,17 @@ def troskovi_api():
         print(f"API Error: {e}")
         return jsonify({'error': 'Greška na serveru'}), 500
 
+@app.route('/api/troskovi/export', methods=['GET'])
+def izvoz_troskova_api():
+    try:
+        return trosak_service.izvezi_troskove(
+            export_format(request.args.get('format')),
+            request.args.get('kategorija'), request.args.get('status'),
+            request.args.get('datum_od'), request.args.get('datum_do')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
 @app.route('/api/troskovi/<trosak_id>', methods=['GET', 'PUT', 'DELETE'])
 def trosak_api(trosak_id):
     try:
@@ -1,5 +1,4 @@
 #!/usr/bin/env python3
-import sqlite3
 import json
 import uuid
 from datetime import datetime
@@ -8,6 +7,11 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 from dataclasses import dataclass
 import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from shared.instrumentation import connect_db, instrument_app
+from shared.export import export_format, export_response
+from shared.http import enable_conditional_responses
 
 @dataclass
 class Faktura:
@@ -35,7 +39,7 @@ class DatabaseManager:
         self.init_database()
 
     def init_database(self):
-        conn = sqlite3.connect(self.db_path)
+        conn = connect_db(self.db_path)
         cursor = conn.cursor()
         cursor.execute('''
                        CREATE TABLE IF NOT EXISTS fakture (
@@ -65,7 +69,7 @@ class DatabaseManager:
 
     def execute_query(self, query, params=None):
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = connect_db(self.db_path)
             cursor = conn.cursor()
             if params:
                 cursor.execute(query, params)
@@ -123,7 +127,7 @@ class FakturaService:
         params.append(faktura_id)
         query = f"UPDATE fakture SET {', '.join(update_fields)} WHERE id = ?"
         try:
-            conn = sqlite3.connect(self.db.db_path)
+            conn = connect_db(self.db.db_path)
             cursor = conn.cursor()
             cursor.execute(query, params)
             success = cursor.rowcount > 0
@@ -137,7 +141,7 @@ class FakturaService:
 
     def obrisi_fakturu(self, faktura_id: str) -> bool:
         try:
-            conn = sqlite3.connect(self.db.db_path)
+            conn = connect_db(self.db.db_path)
             cursor = conn.cursor()
             cursor.execute("DELETE FROM stavke WHERE faktura_id = ?", (faktura_id,))
             cursor.execute("DELETE FROM fakture WHERE id = ?", (faktura_id,))
@@ -175,11 +179,19 @@ class FakturaService:
         print(f"Dobijeno {len(fakture)} faktura")
         return fakture
 
+    def izvezi_fakture(self, format_name: str):
+        cols = ['id', 'klijent_id', 'broj_fakture', 'datum', 'iznos', 'status']
+        return export_response(self.db.db_path, "SELECT * FROM fakture ORDER BY datum DESC", (),
+                               cols, format_name, 'fakture')
+
 app = Flask(__name__)
+instrument_app(app, 'invoice-service')
 CORS(app)
 db = DatabaseManager()
 faktura_service = FakturaService(db)
 
+enable_conditional_responses(app)
+
 @app.route('/api/fakture', methods=['GET', 'POST'])
 def fakture_api():
     try:
@@ -201,6 +213,13 @@ def fakture_api():
         print(f"API Error: {e}")
         return jsonify({'error': 'Greška na serveru'}), 500
 
+@app.route('/api/fakture/export', methods=['GET'])
+def izvoz_faktura_api():
+    try:
+        return faktura_service.izvezi_fakture(export_format(request.args.get('format')))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
 @app.route('/api/fakture/<faktura_id>', methods=['GET', 'PUT', 'DELETE'])
 def faktura_api(faktura_id):
     try:
@@ -1,17 +1,42 @@
 #!/usr/bin/env python3
-from dbm import sqlite3
-
 import pika
 import json
 import uuid
+import os
+import sys
+import time
 from datetime import datetime
 from typing import Dict, Any, Callable
-import logging
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from shared.instrumentation import connect_db, metrics, start_metrics_server
+from shared import tracing
+from shared.rabbitmq import connect_rabbitmq
+
+class DatabaseManager:
+    def __init__(self, db_path="../db/epos.db"):
+        self.db_path = os.path.abspath(os.path.join(os.path.dirname(__file__), db_path))
+        if not os.path.isfile(self.db_path):
+            raise FileNotFoundError(f"Baza {self.db_path} ne postoji; pokrenite servise prije MQ workera")
+        print(f"Message Queue Database path: {self.db_path}")
+
+    def execute_query(self, query: str, params=None):
+        conn = connect_db(self.db_path)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query, params or ())
+            if query.strip().upper().startswith('SELECT'):
+                return cursor.fetchall()
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            conn.close()
 
 class MessageQueueManager:
-    def __init__(self, host='localhost', queue_name='epos_queue'):
+    def __init__(self, host='localhost', queue_name='epos_queue', metrics_port: int = None):
         self.host = host
         self.queue_name = queue_name
+        self.metrics_port = int(os.getenv('MQ_METRICS_PORT', '9100')) if metrics_port is None else metrics_port
+        self.metrics_server = None
         self.connection = None
         self.channel = None
         self.callbacks = {}
@@ -19,24 +44,23 @@ class MessageQueueManager:
 
     def setup_connection(self):
         try:
-            self.connection = pika.BlockingConnection(
-                pika.ConnectionParameters(host=self.host)
-            )
+            self.connection = connect_rabbitmq(self.host)
             self.channel = self.connection.channel()
             self.channel.queue_declare(queue=self.queue_name, durable=True)
-            print(f"Connected to RabbitMQ at {self.host}")
         except Exception as e:
             print(f"Failed to connect to RabbitMQ: {e}")
             raise
 
     def publish_message(self, message_type: str, data: Dict[Any, Any],
-                        routing_key: str = None):
+                        routing_key: str = None, tenant_id: str = None):
         message = {
             'id': str(uuid.uuid4()),
             'type': message_type,
             'timestamp': datetime.now().isoformat(),
             'data': data
         }
+        if tenant_id:
+            message['tenant_id'] = tenant_id
         if not routing_key:
             routing_key = self.queue_name
         self.channel.basic_publish(
@@ -45,7 +69,8 @@ class MessageQueueManager:
             body=json.dumps(message),
             properties=pika.BasicProperties(
                 delivery_mode=2,
-                correlation_id=message['id']
+                correlation_id=message['id'],
+                headers=tracing.message_headers()
             )
         )
         print(f"Published message: {message_type}")
@@ -53,22 +78,63 @@ class MessageQueueManager:
     def register_callback(self, message_type: str, callback: Callable):
         self.callbacks[message_type] = callback
 
+    def send_reply(self, ch, properties, result: Dict[Any, Any]):
+        if not properties or not properties.reply_to:
+            return
+        ch.basic_publish(
+            exchange='',
+            routing_key=properties.reply_to,
+            body=json.dumps(result),
+            properties=pika.BasicProperties(
+                correlation_id=properties.correlation_id,
+                headers=properties.headers
+            )
+        )
+
+    def start_message_trace(self, properties, message_type: str):
+        headers = (properties.headers if properties else None) or {}
+        trace_id = headers.get('trace_id')
+        if not tracing.valid_trace_id(trace_id):
+            return None
+        token = tracing.start_trace(trace_id, headers.get('parent_span_id'))
+        published_at = headers.get('published_at')
+        if isinstance(published_at, (int, float)):
+            queue_wait = max(time.time() - published_at, 0.0)
+            metrics.observe('mq_queue_wait_seconds', queue_wait, {'queue': self.queue_name})
+            tracing.record_span(trace_id, tracing.new_span_id(), headers.get('parent_span_id'),
+                                f'queue_wait {self.queue_name}', published_at, queue_wait,
+                                {'type': message_type})
+        return token
+
     def process_message(self, ch, method, properties, body):
+        token = None
+        start_time = time.perf_counter()
         try:
             message = json.loads(body)
             message_type = message.get('type')
+            token = self.start_message_trace(properties, message_type)
             if message_type in self.callbacks:
-                self.callbacks[message_type](message)
+                with tracing.span(f'handle {message_type}', correlation_id=properties.correlation_id):
+                    result = self.callbacks[message_type](message)
+                self.send_reply(ch, properties, result or {'status': 'success'})
                 ch.basic_ack(delivery_tag=method.delivery_tag)
                 print(f"Processed message: {message_type}")
             else:
                 print(f"No callback for message type: {message_type}")
+                self.send_reply(ch, properties, {'error': f'Nepodržan tip poruke: {message_type}'})
                 ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
         except Exception as e:
             print(f"Error processing message: {e}")
             ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+        finally:
+            if token is not None:
+                tracing.end_trace(token)
+            metrics.observe('mq_consume_duration_seconds', time.perf_counter() - start_time,
+                            {'queue': self.queue_name})
 
     def start_consuming(self):
+        if self.metrics_port and self.metrics_server is None:
+            self.metrics_server = start_metrics_server(self.metrics_port, 'message-queue')
         self.channel.basic_qos(prefetch_count=1)
         self.channel.basic_consume(
             queue=self.queue_name,
@@ -92,18 +158,25 @@ class KlijentServiceMQ:
     def handle_create_client(self, message):
         try:
             data = message['data']
+            tenant_id = message.get('tenant_id')
+            if not tenant_id:
+                raise ValueError("Poruka nema tenant_id")
             klijent_id = str(uuid.uuid4())
             datum = datetime.now().isoformat()
-            postojeci = self.db.execute_query("SELECT id FROM klijenti WHERE email = ?", (data['email'],))
+            postojeci = self.db.execute_query("SELECT id FROM klijenti WHERE tenant_id = ? AND email = ?",
+                                              (tenant_id, data['email']))
             if postojeci:
+                error = f"Klijent sa email-om {data['email']} već postoji"
                 self.mq.publish_message('client_creation_failed', {
-                    'error': f"Klijent sa email-om {data['email']} već postoji",
+                    'error': error,
                     'original_message_id': message['id']
                 })
-                return
+                return {'error': error}
             self.db.execute_query(
-                "INSERT INTO klijenti (id, naziv, email, telefon, adresa, datum_kreiranja) VALUES (?, ?, ?, ?, ?, ?)",
-                (klijent_id, data['naziv'], data['email'], data.get('telefon', ''), data.get('adresa', ''), datum)
+                """INSERT INTO klijenti (id, tenant_id, naziv, email, telefon, adresa, datum_kreiranja)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (klijent_id, tenant_id, data['naziv'], data['email'], data.get('telefon', ''),
+                 data.get('adresa', ''), datum)
             )
             self.mq.publish_message('client_created', {
                 'klijent_id': klijent_id,
@@ -111,21 +184,24 @@ class KlijentServiceMQ:
                 'original_message_id': message['id']
             })
             print(f"Kreiran klijent preko MQ: {data['naziv']} sa ID: {klijent_id}")
+            return {'klijent_id': klijent_id}
         except Exception as e:
             self.mq.publish_message('client_creation_failed', {
                 'error': str(e),
                 'original_message_id': message['id']
             })
+            return {'error': str(e)}
 
     def handle_update_client(self, message):
         try:
             data = message['data']
             klijent_id = data['klijent_id']
-            conn = sqlite3.connect(self.db.db_path)
+            conn = connect_db(self.db.db_path)
             cursor = conn.cursor()
             cursor.execute(
-                "UPDATE klijenti SET naziv = ?, email = ?, telefon = ?, adresa = ? WHERE id = ?",
-                (data['naziv'], data['email'], data['telefon'], data['adresa'], klijent_id)
+                "UPDATE klijenti SET naziv = ?, email = ?, telefon = ?, adresa = ? WHERE id = ? AND tenant_id = ?",
+                (data['naziv'], data['email'], data['telefon'], data['adresa'], klijent_id,
+                 message.get('tenant_id'))
             )
             success = cursor.rowcount > 0
             conn.commit()
@@ -135,24 +211,27 @@ class KlijentServiceMQ:
                     'klijent_id': klijent_id,
                     'original_message_id': message['id']
                 })
-            else:
-                self.mq.publish_message('client_update_failed', {
-                    'error': 'Klijent nije pronađen',
-                    'original_message_id': message['id']
-                })
+                return {'klijent_id': klijent_id}
+            self.mq.publish_message('client_update_failed', {
+                'error': 'Klijent nije pronađen',
+                'original_message_id': message['id']
+            })
+            return {'error': 'Klijent nije pronađen'}
         except Exception as e:
             self.mq.publish_message('client_update_failed', {
                 'error': str(e),
                 'original_message_id': message['id']
             })
+            return {'error': str(e)}
 
     def handle_delete_client(self, message):
         try:
             data = message['data']
             klijent_id = data['klijent_id']
-            conn = sqlite3.connect(self.db.db_path)
+            conn = connect_db(self.db.db_path)
             cursor = conn.cursor()
-            cursor.execute("UPDATE klijenti SET aktivan = 0 WHERE id = ?", (klijent_id,))
+            cursor.execute("UPDATE klijenti SET aktivan = 0 WHERE id = ? AND tenant_id = ?",
+                           (klijent_id, message.get('tenant_id')))
             success = cursor.rowcount > 0
             conn.commit()
             conn.close()
@@ -161,16 +240,18 @@ class KlijentServiceMQ:
                     'klijent_id': klijent_id,
                     'original_message_id': message['id']
                 })
-            else:
-                self.mq.publish_message('client_delete_failed', {
-                    'error': 'Klijent nije pronađen',
-                    'original_message_id': message['id']
-                })
+                return {'klijent_id': klijent_id}
+            self.mq.publish_message('client_delete_failed', {
+                'error': 'Klijent nije pronađen',
+                'original_message_id': message['id']
+            })
+            return {'error': 'Klijent nije pronađen'}
         except Exception as e:
             self.mq.publish_message('client_delete_failed', {
                 'error': str(e),
                 'original_message_id': message['id']
             })
+            return {'error': str(e)}
 
 class FakturaServiceMQ:
     def __init__(self, db_manager, mq_manager):
@@ -220,16 +301,53 @@ class FakturaServiceMQ:
                 'povezano_sa': faktura_id
             })
             print(f"Kreirana faktura preko MQ: {broj_fakture}")
+            return {'faktura_id': faktura_id, 'broj_fakture': broj_fakture}
         except Exception as e:
             self.mq.publish_message('invoice_creation_failed', {
                 'error': str(e),
                 'original_message_id': message['id']
             })
+            return {'error': str(e)}
+
+    def handle_update_invoice(self, message):
+        try:
+            data = message['data']
+            faktura_id = data['faktura_id']
+            update_fields = []
+            params = []
+            if data.get('status'):
+                update_fields.append("status = ?")
+                params.append(data['status'])
+            if data.get('iznos') is not None:
+                update_fields.append("iznos = ?")
+                params.append(float(data['iznos']))
+            if not update_fields:
+                return {'error': 'Nedostaju podaci'}
+            params.append(faktura_id)
+            conn = connect_db(self.db.db_path)
+            cursor = conn.cursor()
+            cursor.execute(f"UPDATE fakture SET {', '.join(update_fields)} WHERE id = ?", params)
+            success = cursor.rowcount > 0
+            conn.commit()
+            conn.close()
+            if success:
+                self.mq.publish_message('invoice_updated', {
+                    'faktura_id': faktura_id,
+                    'original_message_id': message['id']
+                })
+                return {'faktura_id': faktura_id}
+            return {'error': 'Faktura nije pronađena'}
+        except Exception as e:
+            self.mq.publish_message('invoice_update_failed', {
+                'error': str(e),
+                'original_message_id': message['id']
+            })
+            return {'error': str(e)}
 
     def handle_client_deleted(self, message):
         try:
             klijent_id = message['data']['klijent_id']
-            conn = sqlite3.connect(self.db.db_path)
+            conn = connect_db(self.db.db_path)
             cursor = conn.cursor()
             cursor.execute(
                 "UPDATE fakture SET status = 'otkazana' WHERE klijent_id = ? AND status != 'placena'",
@@ -272,11 +390,13 @@ class TrosakServiceMQ:
                 'original_message_id': message.get('id')
             })
             print(f"Kreiran trošak preko MQ: {data['naziv']} - {data['iznos']} KM")
+            return {'trosak_id': trosak_id}
         except Exception as e:
             self.mq.publish_message('expense_creation_failed', {
                 'error': str(e),
                 'original_message_id': message.get('id')
             })
+            return {'error': str(e)}
 
     def handle_invoice_created(self, message):
         try:
@@ -296,14 +416,27 @@ class TrosakServiceMQ:
         except Exception as e:
             print(f"Greška pri kreiranju automatskih troškova: {e}")
 
-if __name__ == "__main__":
-    mq = MessageQueueManager()
+def start_worker():
+    db = DatabaseManager(os.getenv('DB_PATH', '../db/epos.db'))
+    mq = MessageQueueManager(os.getenv('RABBITMQ_HOST', 'localhost'))
+    KlijentServiceMQ(db, mq)
+    FakturaServiceMQ(db, mq)
+    TrosakServiceMQ(db, mq)
+    try:
+        mq.start_consuming()
+    except KeyboardInterrupt:
+        print("Zaustavljanje MQ workera")
+    finally:
+        mq.close()
+
+def publish_test_messages(tenant_id: str):
+    mq = MessageQueueManager(os.getenv('RABBITMQ_HOST', 'localhost'))
     mq.publish_message('create_client', {
         'naziv': 'Test Company d.o.o.',
         'email': 'test@company.com',
         'telefon': '+387 51 123 456',
         'adresa': 'Test adresa 123, Banja Luka'
-    })
+    }, tenant_id=tenant_id)
     mq.publish_message('create_invoice', {
         'klijent_id': 'some-client-id',
         'stavke': [
@@ -311,4 +444,11 @@ if __name__ == "__main__":
             {'naziv': 'Usluga 2', 'kolicina': 1, 'cijena': 50}
         ]
     })
-    print("Poruke poslane u queue")
\ No newline at end of file
+    print("Poruke poslane u queue")
+    mq.close()
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == 'test':
+        publish_test_messages(sys.argv[2])
+    else:
+        start_worker()
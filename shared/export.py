@@ -0,0 +1,51 @@
+import io
+import csv
+import json
+from typing import Iterator, List, Sequence
+from flask import Response
+from shared.instrumentation import connect_db
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv; charset=utf-8', 'csv')
+}
+
+def export_format(value) -> str:
+    format_name = value or 'ndjson'
+    if format_name not in EXPORT_FORMATS:
+        raise ValueError('Nepodržan format izvoza (csv, ndjson)')
+    return format_name
+
+def stream_rows(db_path: str, query: str, params: Sequence, columns: List[str], format_name: str,
+                chunk_size: int = 1000) -> Iterator[bytes]:
+    conn = connect_db(db_path)
+    try:
+        cursor = conn.execute(query, params)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer) if format_name == 'csv' else None
+        if writer:
+            writer.writerow(columns)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            if writer:
+                writer.writerows(rows)
+            else:
+                for row in rows:
+                    buffer.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+                    buffer.write('\n')
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        if writer and buffer.tell():
+            yield buffer.getvalue().encode()
+    finally:
+        conn.close()
+
+def export_response(db_path: str, query: str, params: Sequence, columns: List[str], format_name: str,
+                    filename: str, chunk_size: int = 1000) -> Response:
+    mimetype, extension = EXPORT_FORMATS[format_name]
+    return Response(stream_rows(db_path, query, params, columns, format_name, chunk_size),
+                    content_type=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}.{extension}"'})
@@ -0,0 +1,24 @@
+import gzip
+import hashlib
+import os
+from flask import Flask, request
+
+GZIP_MIN_BYTES = int(os.getenv('GZIP_MIN_BYTES', '1024'))
+SUBREQUEST_ENVIRON_KEY = 'epos.subrequest'
+
+def conditional_response(response):
+    if request.method != 'GET' or response.status_code != 200 or response.direct_passthrough \
+            or response.is_streamed or request.environ.get(SUBREQUEST_ENVIRON_KEY):
+        return response
+    body = response.get_data()
+    use_gzip = len(body) >= GZIP_MIN_BYTES and request.accept_encodings.quality('gzip') > 0
+    response.set_etag(hashlib.sha1(body).hexdigest() + ('-gzip' if use_gzip else ''))
+    response.vary.add('Accept-Encoding')
+    response.make_conditional(request)
+    if use_gzip and response.status_code == 200:
+        response.set_data(gzip.compress(body, compresslevel=5, mtime=0))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+def enable_conditional_responses(app: Flask):
+    app.after_request(conditional_response)
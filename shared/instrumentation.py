@@ -0,0 +1,299 @@
+import hmac
+import os
+import sqlite3
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from typing import Dict, Any, Optional, Callable
+from flask import Flask, Response, jsonify, request
+from . import tracing
+
+class LatencyHistogram:
+    DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.lock = Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self.lock:
+            counts = list(self.counts)
+            count = self.count
+        if not count:
+            return None
+        rank = q * count
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            seen += bucket_count
+            if seen >= rank:
+                return self.buckets[index] if index < len(self.buckets) else float('inf')
+        return float('inf')
+
+    def cumulative(self):
+        with self.lock:
+            counts = list(self.counts)
+            count = self.count
+            total = self.total
+        buckets = []
+        running = 0
+        for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+            running += bucket_count
+            buckets.append((str(bound), running))
+        return buckets, count, total
+
+    def snapshot(self) -> Dict[str, Any]:
+        buckets, count, total = self.cumulative()
+        return {
+            'count': count,
+            'sum': round(total, 6),
+            'avg': round(total / count, 6) if count else None,
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+            'buckets': dict(buckets)
+        }
+
+def escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(labels, extra=None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in items) + '}'
+
+class MetricsRegistry:
+    def __init__(self):
+        self.counters = {}
+        self.gauges = {}
+        self.gauge_callbacks = {}
+        self.histograms = {}
+        self.lock = Lock()
+
+    @staticmethod
+    def key(name: str, labels: Optional[Dict[str, Any]]):
+        return name, tuple(sorted((labels or {}).items()))
+
+    def inc(self, name: str, labels: Optional[Dict[str, Any]] = None, amount: float = 1):
+        key = self.key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def gauge_add(self, name: str, amount: float, labels: Optional[Dict[str, Any]] = None):
+        key = self.key(name, labels)
+        with self.lock:
+            self.gauges[key] = self.gauges.get(key, 0) + amount
+
+    def register_gauge(self, name: str, callback: Callable[[], float], labels: Optional[Dict[str, Any]] = None):
+        with self.lock:
+            self.gauge_callbacks[self.key(name, labels)] = callback
+
+    def histogram(self, name: str, labels: Optional[Dict[str, Any]] = None) -> LatencyHistogram:
+        key = self.key(name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(key, LatencyHistogram())
+        return histogram
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, Any]] = None):
+        self.histogram(name, labels).observe(value)
+
+    def render(self) -> str:
+        with self.lock:
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            callbacks = dict(self.gauge_callbacks)
+            histograms = dict(self.histograms)
+        for key, callback in callbacks.items():
+            try:
+                gauges[key] = callback()
+            except Exception as e:
+                print(f"Metrics gauge {key[0]} failed: {e}")
+        lines = []
+        for kind, series in (('counter', counters), ('gauge', gauges)):
+            declared = set()
+            for (name, labels), value in sorted(series.items()):
+                if name not in declared:
+                    lines.append(f'# TYPE {name} {kind}')
+                    declared.add(name)
+                lines.append(f'{name}{format_labels(labels)} {value}')
+        declared = set()
+        for (name, labels), histogram in sorted(histograms.items()):
+            if name not in declared:
+                lines.append(f'# TYPE {name} histogram')
+                declared.add(name)
+            buckets, count, total = histogram.cumulative()
+            for bound, value in buckets:
+                lines.append(f'{name}_bucket{format_labels(labels, ("le", bound))} {value}')
+            lines.append(f'{name}_sum{format_labels(labels)} {total}')
+            lines.append(f'{name}_count{format_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+metrics = MetricsRegistry()
+
+def sql_operation(sql: str) -> str:
+    words = sql.split(None, 1)
+    return words[0].lower() if words else 'other'
+
+def observe_query(sql: str, started_at: float, duration: float):
+    operation = sql_operation(sql)
+    metrics.observe('sqlite_query_duration_seconds', duration, {'operation': operation})
+    trace = tracing.current_trace.get()
+    if trace is not None:
+        tracing.record_span(trace[0], tracing.new_span_id(), trace[1], f'sqlite {operation}',
+                            started_at, duration, {'statement': ' '.join(sql.split())[:200]})
+
+class TimedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        started_at = time.time()
+        start_time = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            observe_query(sql, started_at, time.perf_counter() - start_time)
+
+    def executemany(self, sql, seq_of_parameters):
+        started_at = time.time()
+        start_time = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            observe_query(sql, started_at, time.perf_counter() - start_time)
+
+    def fetchall(self):
+        start_time = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            metrics.observe('sqlite_query_duration_seconds', time.perf_counter() - start_time,
+                            {'operation': 'fetch'})
+
+class TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+def connect_db(db_path: str, **kwargs) -> sqlite3.Connection:
+    return sqlite3.connect(db_path, factory=TimedConnection, **kwargs)
+
+LOOPBACK_ADDRESSES = ('127.0.0.1', '::1')
+TRACES_TOKEN_HEADER = 'X-Traces-Token'
+
+def traces_authorized() -> bool:
+    token = os.getenv('TRACES_TOKEN')
+    if token:
+        return hmac.compare_digest(request.headers.get(TRACES_TOKEN_HEADER, ''), token)
+    return request.remote_addr in LOOPBACK_ADDRESSES
+
+def start_metrics_server(port: int, service: str, host: str = '0.0.0.0') -> ThreadingHTTPServer:
+    tracing.configure(service)
+    metrics.register_gauge('service_info', lambda: 1, {'service': service})
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    print(f"Serving {service} metrics on {host}:{server.server_port}/metrics")
+    return server
+
+def instrument_app(app: Flask, service: str):
+    tracing.configure(service)
+    metrics.register_gauge('service_info', lambda: 1, {'service': service})
+
+    @app.before_request
+    def start_request_timer():
+        metrics.gauge_add('http_requests_in_flight', 1)
+        parent = tracing.current_trace.get()
+        if parent is not None:
+            trace_id, parent_id = parent
+        else:
+            trace_id = request.headers.get(tracing.TRACE_HEADER)
+            if tracing.valid_trace_id(trace_id):
+                parent_id = request.headers.get(tracing.PARENT_SPAN_HEADER, '')[:32] or None
+            else:
+                trace_id = tracing.new_trace_id()
+                parent_id = None
+        span_id = tracing.new_span_id()
+        token = tracing.current_trace.set((trace_id, span_id))
+        request.environ['epos.request'] = {
+            'start_time': time.perf_counter(),
+            'started_at': time.time(),
+            'trace': (token, trace_id, span_id, parent_id),
+            'status': None
+        }
+
+    @app.after_request
+    def record_request(response):
+        state = request.environ.get('epos.request')
+        if state is not None and state['status'] is None:
+            endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+            metrics.observe('http_request_duration_seconds', time.perf_counter() - state['start_time'],
+                            {'endpoint': endpoint, 'method': request.method})
+            metrics.inc('http_requests_total',
+                        {'endpoint': endpoint, 'method': request.method, 'status': response.status_code})
+            state['status'] = response.status_code
+            response.headers[tracing.TRACE_HEADER] = state['trace'][1]
+        return response
+
+    @app.teardown_request
+    def finish_request(exception=None):
+        state = request.environ.pop('epos.request', None)
+        if state is None:
+            return
+        metrics.gauge_add('http_requests_in_flight', -1)
+        token, trace_id, span_id, parent_id = state['trace']
+        try:
+            tracing.current_trace.reset(token)
+        except ValueError:
+            tracing.current_trace.set(None)
+        endpoint = request.url_rule.rule if request.url_rule else request.path
+        attributes = {'status': state['status'] or 500}
+        if exception is not None:
+            attributes['error'] = type(exception).__name__
+        tracing.record_span(trace_id, span_id, parent_id, f'{request.method} {endpoint}', state['started_at'],
+                            time.perf_counter() - state['start_time'], attributes)
+
+    def metrics_endpoint():
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+    def traces_endpoint(trace_id=None):
+        if not traces_authorized():
+            return jsonify({'error': 'Forbidden'}), 403
+        trace_log = tracing.get_trace_log()
+        if trace_log is None:
+            return jsonify({'error': 'Trace log is disabled'}), 503
+        min_duration_ms = request.args.get('min_ms', type=float)
+        limit = min(request.args.get('limit', 100, type=int), 1000)
+        spans = trace_log.query(trace_id, min_duration_ms, request.args.get('name'), limit)
+        return jsonify({'trace_id': trace_id, 'spans': spans, 'log': trace_log.stats()})
+
+    app.add_url_rule('/metrics', 'metrics', metrics_endpoint)
+    app.add_url_rule('/traces', 'traces', traces_endpoint)
+    app.add_url_rule('/traces/<trace_id>', 'traces', traces_endpoint)
@@ -0,0 +1,92 @@
+import time
+import uuid
+import atexit
+from collections import deque
+from datetime import datetime
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Dict, List
+from shared.instrumentation import metrics
+
+class UsageMeter:
+    def __init__(self, sink: Callable[[List[Dict[str, Any]]], None], batch_size: int = 500,
+                 flush_interval: float = 5.0, max_pending: int = 100000):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.pending = deque()
+        self.lock = Lock()
+        self.flush_lock = Lock()
+        self.wakeup = Event()
+        self.recorded = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.failures = 0
+        metrics.register_gauge('metering_pending_events', lambda: len(self.pending))
+        self.thread = Thread(target=self.run, daemon=True)
+        self.thread.start()
+        atexit.register(self.flush)
+
+    def record(self, tenant_id: str, endpoint: str, method: str, cost: float):
+        with self.lock:
+            if len(self.pending) >= self.max_pending:
+                self.pending.popleft()
+                self.dropped += 1
+            self.pending.append((str(uuid.uuid4()), tenant_id, endpoint, method, cost, time.time()))
+            self.recorded += 1
+            full = len(self.pending) >= self.batch_size
+        if full:
+            self.wakeup.set()
+
+    def run(self):
+        while True:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            failures = self.failures
+            self.flush()
+            if self.failures != failures:
+                time.sleep(self.flush_interval)
+
+    def flush(self) -> int:
+        flushed = 0
+        with self.flush_lock:
+            while True:
+                with self.lock:
+                    batch = [self.pending.popleft() for _ in range(min(self.batch_size, len(self.pending)))]
+                if not batch:
+                    return flushed
+                events = [{
+                    'id': event_id,
+                    'tenant_id': tenant_id,
+                    'endpoint': endpoint,
+                    'method': method,
+                    'cost': cost,
+                    'timestamp': datetime.fromtimestamp(recorded_at).isoformat()
+                } for event_id, tenant_id, endpoint, method, cost, recorded_at in batch]
+                start_time = time.perf_counter()
+                try:
+                    self.sink(events)
+                except Exception as e:
+                    with self.lock:
+                        self.failures += 1
+                        keep = batch[:max(0, self.max_pending - len(self.pending))]
+                        self.pending.extendleft(reversed(keep))
+                        self.dropped += len(batch) - len(keep)
+                    metrics.inc('metering_flush_failures_total')
+                    print(f"Error flushing API usage ({len(batch)} events): {e}")
+                    return flushed
+                metrics.observe('metering_flush_duration_seconds', time.perf_counter() - start_time)
+                metrics.inc('metering_flushed_events_total', amount=len(batch))
+                with self.lock:
+                    self.flushed += len(batch)
+                flushed += len(batch)
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {
+                'recorded': self.recorded,
+                'flushed': self.flushed,
+                'pending': len(self.pending),
+                'dropped': self.dropped,
+                'failures': self.failures
+            }
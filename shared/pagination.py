@@ -0,0 +1,30 @@
+import base64
+import json
+from typing import Any, Dict, List, Optional
+
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+def encode_cursor(*values) -> str:
+    data = json.dumps(values, separators=(',', ':'), ensure_ascii=False).encode()
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except ValueError:
+        raise ValueError('Neispravan kursor')
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError('Neispravan kursor')
+    return values
+
+def page_limit(value: Optional[str], default: int, maximum: int) -> int:
+    try:
+        limit = int(value) if value not in (None, '') else default
+    except ValueError:
+        raise ValueError('Neispravan limit')
+    return max(1, min(limit, maximum))
+
+def next_cursor(rows: List[Dict[str, Any]], limit: int, keys=('naziv', 'id')) -> Optional[str]:
+    if len(rows) < limit or not rows:
+        return None
+    return encode_cursor(*[rows[-1][key] for key in keys])
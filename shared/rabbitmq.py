@@ -0,0 +1,20 @@
+import os
+
+def rabbitmq_credentials():
+    import pika
+    return [
+        pika.PlainCredentials(os.getenv('RABBITMQ_USER', 'epos_user'), os.getenv('RABBITMQ_PASSWORD', 'epos_password')),
+        pika.PlainCredentials('guest', 'guest')
+    ]
+
+def connect_rabbitmq(host: str = None):
+    import pika
+    host = host or os.getenv('RABBITMQ_HOST', 'localhost')
+    for i, credentials in enumerate(rabbitmq_credentials()):
+        try:
+            connection = pika.BlockingConnection(pika.ConnectionParameters(host=host, credentials=credentials))
+            print(f"Connected to RabbitMQ at {host} as {credentials.username}")
+            return connection
+        except Exception as e:
+            print(f"RabbitMQ credentials attempt {i + 1} failed: {e}")
+    raise Exception("All credential attempts failed")
@@ -0,0 +1,152 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Any, Optional
+
+TENANT_CONTEXT_HEADER = 'X-Tenant-Context'
+SERVICE_SIGNATURE_HEADER = 'X-Service-Signature'
+TENANT_CONTEXT_FIELDS = ('id', 'naziv', 'status')
+
+def context_secret() -> Optional[bytes]:
+    secret = os.getenv('TENANT_CONTEXT_SECRET')
+    return secret.encode() if secret else None
+
+def api_key_fingerprint(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+def encode_part(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+def decode_part(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+def sign_tenant_context(tenant: Dict[str, Any], api_key: str, ttl: int = 60,
+                        secret: Optional[bytes] = None) -> Optional[str]:
+    secret = secret or context_secret()
+    if not secret:
+        return None
+    payload = {field: tenant.get(field) for field in TENANT_CONTEXT_FIELDS}
+    payload['key'] = api_key_fingerprint(api_key)
+    payload['exp'] = int(time.time()) + ttl
+    body = encode_part(json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode())
+    signature = encode_part(hmac.new(secret, body.encode(), hashlib.sha256).digest())
+    return f'{body}.{signature}'
+
+def verify_tenant_context(header: Optional[str], api_key: Optional[str],
+                          secret: Optional[bytes] = None) -> Optional[Dict[str, Any]]:
+    secret = secret or context_secret()
+    if not secret or not header or not api_key or '.' not in header:
+        return None
+    body, signature = header.rsplit('.', 1)
+    expected = encode_part(hmac.new(secret, body.encode(), hashlib.sha256).digest())
+    if not hmac.compare_digest(signature, expected):
+        return None
+    try:
+        payload = json.loads(decode_part(body))
+    except ValueError:
+        return None
+    if payload.get('exp', 0) < time.time() or payload.get('key') != api_key_fingerprint(api_key):
+        return None
+    if payload.get('status') != 'active':
+        return None
+    return {field: payload.get(field) for field in TENANT_CONTEXT_FIELDS}
+
+def sign_service_request(body: bytes, secret: Optional[bytes] = None) -> Optional[str]:
+    secret = secret or context_secret()
+    if not secret:
+        return None
+    timestamp = str(int(time.time()))
+    signature = hmac.new(secret, timestamp.encode() + b'.' + body, hashlib.sha256).hexdigest()
+    return f'{timestamp}.{signature}'
+
+def verify_service_request(header: Optional[str], body: bytes, max_age: int = 300,
+                           secret: Optional[bytes] = None) -> bool:
+    secret = secret or context_secret()
+    if not secret or not header or '.' not in header:
+        return False
+    timestamp, signature = header.split('.', 1)
+    if not timestamp.isdigit() or abs(time.time() - int(timestamp)) > max_age:
+        return False
+    expected = hmac.new(secret, timestamp.encode() + b'.' + body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(signature, expected)
+
+class TenantCache:
+    def __init__(self, ttl: int = 60, negative_ttl: int = 10, max_entries: int = 10000):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(api_key: str) -> str:
+        return hashlib.sha256(api_key.encode()).hexdigest()
+
+    def get(self, api_key: str):
+        key = self.key(api_key)
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return False, None
+            self.entries.move_to_end(key)
+            if entry[1] is None:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return True, entry[1]
+
+    def set(self, api_key: str, tenant: Optional[Dict[str, Any]]):
+        ttl = self.ttl if tenant is not None else self.negative_ttl
+        with self.lock:
+            self.entries[self.key(api_key)] = (time.monotonic() + ttl, tenant)
+            self.entries.move_to_end(self.key(api_key))
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_tenant(self, tenant_id: str) -> int:
+        with self.lock:
+            keys = [key for key, (_, tenant) in self.entries.items() if tenant and tenant.get('id') == tenant_id]
+            for key in keys:
+                del self.entries[key]
+            return len(keys)
+
+    def clear_negative(self) -> int:
+        with self.lock:
+            keys = [key for key, (_, tenant) in self.entries.items() if tenant is None]
+            for key in keys:
+                del self.entries[key]
+            return len(keys)
+
+    def handle_event(self, event: Dict[str, Any]):
+        tenant_id = (event.get('data') or {}).get('tenant_id')
+        if event.get('type') in ('tenant_suspended', 'tenant_deleted') and tenant_id:
+            evicted = self.invalidate_tenant(tenant_id)
+            print(f"Tenant {tenant_id} {event['type']}: evicted {evicted} cached API key(s)")
+        elif event.get('type') == 'tenant_activated':
+            self.clear_negative()
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'hits': self.hits,
+                'negative_hits': self.negative_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.negative_hits) / lookups, 4) if lookups else None,
+                'evictions': self.evictions
+            }
@@ -0,0 +1,37 @@
+import json
+import time
+from threading import Thread
+
+TENANT_EVENTS_EXCHANGE = 'tenant_events'
+TENANT_QUEUE = 'tenant_queue'
+
+def declare_tenant_events(channel):
+    channel.exchange_declare(exchange=TENANT_EVENTS_EXCHANGE, exchange_type='fanout', durable=True)
+    channel.queue_declare(queue=TENANT_QUEUE, durable=True)
+    channel.queue_bind(queue=TENANT_QUEUE, exchange=TENANT_EVENTS_EXCHANGE)
+
+def start_tenant_event_consumer(connect, handler, retry_interval: float = 5.0) -> Thread:
+    def on_event(ch, method, properties, body):
+        try:
+            handler(json.loads(body))
+        except Exception as e:
+            print(f"Error handling tenant event: {e}")
+
+    def consume():
+        while True:
+            try:
+                connection = connect()
+                channel = connection.channel()
+                channel.exchange_declare(exchange=TENANT_EVENTS_EXCHANGE, exchange_type='fanout', durable=True)
+                queue = channel.queue_declare(queue='', exclusive=True).method.queue
+                channel.queue_bind(queue=queue, exchange=TENANT_EVENTS_EXCHANGE)
+                channel.basic_consume(queue=queue, on_message_callback=on_event, auto_ack=True)
+                print("Listening for tenant events")
+                channel.start_consuming()
+            except Exception as e:
+                print(f"Tenant event consumer disconnected: {e}")
+            time.sleep(retry_interval)
+
+    thread = Thread(target=consume, name='tenant-events', daemon=True)
+    thread.start()
+    return thread
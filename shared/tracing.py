@@ -0,0 +1,243 @@
+import contextvars
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from queue import Queue, Empty, Full
+from threading import Thread, Lock
+from typing import Dict, Any, Optional, List
+
+TRACE_HEADER = 'X-Trace-Id'
+PARENT_SPAN_HEADER = 'X-Parent-Span-Id'
+TRACE_ID_PATTERN = re.compile(r'^[A-Za-z0-9\-]{8,64}$')
+DEFAULT_TRACE_LOG_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'db', 'traces.db'))
+
+current_trace = contextvars.ContextVar('current_trace', default=None)
+service_name = os.getenv('SERVICE_NAME', 'epos')
+sample_rate = float(os.getenv('TRACE_SAMPLE_RATE', '1.0'))
+trace_log = None
+trace_log_disabled = False
+trace_log_lock = Lock()
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex
+
+def new_span_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+def valid_trace_id(trace_id: Optional[str]) -> bool:
+    return bool(trace_id) and bool(TRACE_ID_PATTERN.match(trace_id))
+
+def sampled(trace_id: str) -> bool:
+    if sample_rate >= 1:
+        return True
+    return int(hashlib.sha256(trace_id.encode()).hexdigest()[:8], 16) < sample_rate * 0x100000000
+
+def configure(service: str):
+    global service_name
+    service_name = service
+
+def current_trace_id() -> Optional[str]:
+    trace = current_trace.get()
+    return trace[0] if trace else None
+
+class TraceLog:
+    def __init__(self, path: str, max_queue: int = 10000, max_batch: int = 500, flush_interval: float = 1.0,
+                 retention_seconds: float = 86400, max_rows: int = 100000, prune_interval: float = 60):
+        self.path = path
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.retention_seconds = retention_seconds
+        self.max_rows = max_rows
+        self.prune_interval = prune_interval
+        self.queue = Queue(maxsize=max_queue)
+        self.written = 0
+        self.dropped = 0
+        self.pruned = 0
+        self.init_database()
+        self.thread = Thread(target=self.run, name='trace-log', daemon=True)
+        self.thread.start()
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def init_database(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self.connect()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS spans (
+                trace_id TEXT NOT NULL,
+                span_id TEXT NOT NULL,
+                parent_id TEXT,
+                service TEXT NOT NULL,
+                name TEXT NOT NULL,
+                started_at REAL NOT NULL,
+                duration_ms REAL NOT NULL,
+                attributes TEXT
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_spans_trace ON spans(trace_id, started_at)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_spans_started ON spans(started_at)')
+        conn.commit()
+        conn.close()
+
+    def record(self, span: tuple):
+        try:
+            self.queue.put_nowait(span)
+        except Full:
+            self.dropped += 1
+
+    def prune(self, conn: sqlite3.Connection):
+        deleted = 0
+        if self.retention_seconds:
+            deleted += conn.execute('DELETE FROM spans WHERE started_at < ?',
+                                    (time.time() - self.retention_seconds,)).rowcount
+        if self.max_rows:
+            deleted += conn.execute('DELETE FROM spans WHERE rowid <= '
+                                    '(SELECT rowid FROM spans ORDER BY rowid DESC LIMIT 1 OFFSET ?)',
+                                    (self.max_rows,)).rowcount
+        conn.commit()
+        self.pruned += deleted
+
+    def run(self):
+        conn = None
+        next_prune = time.monotonic()
+        while True:
+            batch = []
+            try:
+                batch.append(self.queue.get(timeout=self.flush_interval))
+            except Empty:
+                pass
+            while batch and len(batch) < self.max_batch:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except Empty:
+                    break
+            if not batch and time.monotonic() < next_prune:
+                continue
+            try:
+                if conn is None:
+                    conn = self.connect()
+                if batch:
+                    conn.executemany('INSERT INTO spans VALUES (?, ?, ?, ?, ?, ?, ?, ?)', batch)
+                    conn.commit()
+                    self.written += len(batch)
+                    batch = []
+                if time.monotonic() >= next_prune:
+                    next_prune = time.monotonic() + self.prune_interval
+                    self.prune(conn)
+            except Exception as e:
+                print(f"Trace log write failed: {e}")
+                self.dropped += len(batch)
+                if conn is not None:
+                    conn.close()
+                    conn = None
+
+    def query(self, trace_id: Optional[str] = None, min_duration_ms: Optional[float] = None,
+              name: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        conditions = []
+        params = []
+        if trace_id:
+            conditions.append('trace_id = ?')
+            params.append(trace_id)
+        if min_duration_ms is not None:
+            conditions.append('duration_ms >= ?')
+            params.append(min_duration_ms)
+        if name:
+            conditions.append('name LIKE ?')
+            params.append(f'{name}%')
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        order = 'started_at ASC' if trace_id else 'started_at DESC'
+        conn = self.connect()
+        try:
+            rows = conn.execute(f'SELECT * FROM spans {where} ORDER BY {order} LIMIT ?', params + [limit]).fetchall()
+        finally:
+            conn.close()
+        spans = []
+        for row in rows:
+            span = dict(row)
+            span['attributes'] = json.loads(span['attributes']) if span['attributes'] else {}
+            spans.append(span)
+        return spans
+
+    def stats(self) -> Dict[str, Any]:
+        return {'path': self.path, 'queued': self.queue.qsize(), 'written': self.written, 'dropped': self.dropped,
+                'pruned': self.pruned, 'sample_rate': sample_rate}
+
+def get_trace_log() -> Optional[TraceLog]:
+    global trace_log, trace_log_disabled
+    if trace_log is None and not trace_log_disabled:
+        path = os.getenv('TRACE_LOG_PATH', DEFAULT_TRACE_LOG_PATH)
+        with trace_log_lock:
+            if trace_log is None and not trace_log_disabled:
+                try:
+                    if not path:
+                        raise ValueError('TRACE_LOG_PATH is empty')
+                    trace_log = TraceLog(path,
+                                         retention_seconds=float(os.getenv('TRACE_RETENTION_SECONDS', '86400')),
+                                         max_rows=int(os.getenv('TRACE_MAX_ROWS', '100000')))
+                except Exception as e:
+                    print(f"Trace log disabled: {e}")
+                    trace_log_disabled = True
+    return trace_log
+
+def record_span(trace_id: str, span_id: str, parent_id: Optional[str], name: str,
+                started_at: float, duration: float, attributes: Optional[Dict[str, Any]] = None):
+    if not sampled(trace_id):
+        return
+    log = get_trace_log()
+    if log is None:
+        return
+    log.record((trace_id, span_id, parent_id, service_name, name, started_at, round(duration * 1000, 3),
+                json.dumps(attributes, default=str) if attributes else None))
+
+def start_trace(trace_id: Optional[str] = None, parent_id: Optional[str] = None):
+    if not valid_trace_id(trace_id):
+        trace_id = new_trace_id()
+    return current_trace.set((trace_id, parent_id))
+
+def end_trace(token):
+    current_trace.reset(token)
+
+def trace_headers(span_id: Optional[str] = None) -> Dict[str, str]:
+    trace = current_trace.get()
+    if trace is None:
+        return {}
+    return {TRACE_HEADER: trace[0], PARENT_SPAN_HEADER: span_id or trace[1]}
+
+def message_headers(span_id: Optional[str] = None) -> Dict[str, Any]:
+    headers = {'published_at': time.time()}
+    trace = current_trace.get()
+    if trace is not None:
+        headers['trace_id'] = trace[0]
+        headers['parent_span_id'] = span_id or trace[1]
+    return headers
+
+@contextmanager
+def span(name: str, **attributes):
+    trace = current_trace.get()
+    if trace is None:
+        yield None
+        return
+    trace_id, parent_id = trace
+    span_id = new_span_id()
+    token = current_trace.set((trace_id, span_id))
+    started_at = time.time()
+    start_time = time.perf_counter()
+    try:
+        yield span_id
+    except Exception as e:
+        attributes['error'] = type(e).__name__
+        raise
+    finally:
+        current_trace.reset(token)
+        record_span(trace_id, span_id, parent_id, name, started_at, time.perf_counter() - start_time, attributes)
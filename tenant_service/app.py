@@ -1,13 +1,20 @@
 #!/usr/bin/env python3
-import sqlite3
 import json
 import uuid
 import os
+import time
 from datetime import datetime
 from typing import Dict, List, Optional
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from dataclasses import dataclass
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from shared.instrumentation import connect_db, instrument_app, metrics
+from shared import tracing
+from shared.tenant_events import TENANT_EVENTS_EXCHANGE, declare_tenant_events
+from shared.rabbitmq import connect_rabbitmq
+from shared.tenant_context import SERVICE_SIGNATURE_HEADER, context_secret, verify_service_request
 
 try:
     import pika
@@ -50,7 +57,7 @@ class TenantDatabaseManager:
         self.init_database()
 
     def init_database(self):
-        conn = sqlite3.connect(self.db_path)
+        conn = connect_db(self.db_path)
         cursor = conn.cursor()
         cursor.execute('''
                        CREATE TABLE IF NOT EXISTS tenants
@@ -192,7 +199,7 @@ class TenantDatabaseManager:
 
     def execute_master_query(self, query, params=None):
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = connect_db(self.db_path)
             cursor = conn.cursor()
             if params:
                 cursor.execute(query, params)
@@ -322,13 +329,27 @@ class TenantService:
             print(f"Error suspending tenant: {e}")
             return False
 
-    def record_api_usage(self, tenant_id: str, endpoint: str, method: str, cost: float):
-        usage_id = str(uuid.uuid4())
-        timestamp = datetime.now().isoformat()
-        self.db.execute_master_query(
-            "INSERT INTO api_usage (id, tenant_id, endpoint, method, timestamp, cost) VALUES (?, ?, ?, ?, ?, ?)",
-            (usage_id, tenant_id, endpoint, method, timestamp, cost)
-        )
+    def save_api_usage(self, events: List[Dict]) -> int:
+        rows = []
+        for event in events:
+            try:
+                rows.append((str(event.get('id') or uuid.uuid4())[:64], str(event['tenant_id']),
+                             str(event['endpoint']), str(event['method']),
+                             str(event.get('timestamp') or datetime.now().isoformat()), float(event.get('cost') or 0)))
+            except (KeyError, TypeError, ValueError):
+                continue
+        if rows:
+            conn = connect_db(self.db.db_path)
+            try:
+                with conn:
+                    conn.cursor().executemany(
+                        "INSERT OR IGNORE INTO api_usage (id, tenant_id, endpoint, method, timestamp, cost) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        rows
+                    )
+            finally:
+                conn.close()
+        return len(rows)
 
 class TenantMQHandler:
     def __init__(self, tenant_service: TenantService):
@@ -337,19 +358,28 @@ class TenantMQHandler:
         self.channel = None
         if pika:
             try:
-                self.connection = pika.BlockingConnection(
-                    pika.ConnectionParameters(host='localhost')
-                )
-                self.channel = self.connection.channel()
-                self.channel.queue_declare(queue='tenant_queue', durable=True)
-                print("Connected to RabbitMQ for tenant management")
+                self.connect()
             except Exception as e:
                 print(f"Failed to connect to RabbitMQ: {e}")
-                self.connection = None
-                self.channel = None
+
+    def connect(self):
+        self.close()
+        self.connection = connect_rabbitmq(os.getenv('RABBITMQ_HOST', 'localhost'))
+        self.channel = self.connection.channel()
+        declare_tenant_events(self.channel)
+        print("Connected to RabbitMQ for tenant management")
+
+    def close(self):
+        if self.connection is not None and not self.connection.is_closed:
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+        self.connection = None
+        self.channel = None
 
     def publish_tenant_event(self, event_type: str, tenant_data: Dict):
-        if not self.channel:
+        if not pika:
             return
         message = {
             'id': str(uuid.uuid4()),
@@ -357,15 +387,29 @@ class TenantMQHandler:
             'timestamp': datetime.now().isoformat(),
             'data': tenant_data
         }
-        self.channel.basic_publish(
-            exchange='',
-            routing_key='tenant_queue',
-            body=json.dumps(message),
-            properties=pika.BasicProperties(delivery_mode=2) if pika else None
-        )
+        start_time = time.perf_counter()
+        for attempt in range(2):
+            try:
+                if self.channel is None or self.channel.is_closed:
+                    self.connect()
+                self.channel.basic_publish(
+                    exchange=TENANT_EVENTS_EXCHANGE,
+                    routing_key='tenant_queue',
+                    body=json.dumps(message),
+                    properties=pika.BasicProperties(delivery_mode=2, headers=tracing.message_headers())
+                )
+                break
+            except Exception as e:
+                self.close()
+                if attempt:
+                    raise
+                print(f"Publishing {event_type} failed, reconnecting: {e}")
+        metrics.observe('mq_publish_duration_seconds', time.perf_counter() - start_time, {'queue': 'tenant_queue'})
+        metrics.inc('mq_published_messages_total', {'queue': 'tenant_queue'})
         print(f"Published tenant event: {event_type}")
 
 app = Flask(__name__)
+instrument_app(app, 'tenant-service')
 CORS(app,
      origins=[
          'http://localhost:3000',
@@ -418,7 +462,8 @@ def handle_preflight():
 @app.before_request
 def identify_tenant():
     if request.endpoint in ['health', 'submit_request', 'admin_requests', 'admin_approve', 'admin_reject',
-                            'admin_tenants', 'admin_suspend', 'handle_preflight']:
+                            'admin_tenants', 'admin_suspend', 'handle_preflight', 'metrics', 'traces',
+                            'usage_batch']:
         return
     api_key = request.headers.get('X-Tenant-API-Key')
     if not api_key:
@@ -478,7 +523,10 @@ def admin_approve(request_id):
         napomene = data.get('napomene', '')
         tenant_id = tenant_service.approve_tenant_request(request_id, napomene)
         if mq_handler:
-            mq_handler.publish_tenant_event('tenant_activated', {'tenant_id': tenant_id})
+            try:
+                mq_handler.publish_tenant_event('tenant_activated', {'tenant_id': tenant_id})
+            except Exception as e:
+                print(f"Failed to publish tenant_activated for {tenant_id}: {e}")
         return jsonify({'tenant_id': tenant_id, 'status': 'approved'})
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
@@ -523,6 +571,11 @@ def admin_suspend(tenant_id):
         data = request.json or {}
         razlog = data.get('razlog', 'No reason provided')
         success = tenant_service.suspend_tenant(tenant_id, razlog)
+        if success and mq_handler:
+            try:
+                mq_handler.publish_tenant_event('tenant_suspended', {'tenant_id': tenant_id, 'razlog': razlog})
+            except Exception as e:
+                print(f"Failed to publish tenant_suspended for {tenant_id}: {e}")
         return jsonify({'status': 'suspended' if success else 'failed'})
     except Exception as e:
         print(f"Error suspending tenant: {e}")
@@ -540,6 +593,27 @@ def tenant_info():
         print(f"Error getting tenant info: {e}")
         return jsonify({'error': 'Server error'}), 500
 
+@app.route('/api/usage/batch', methods=['POST'])
+def usage_batch():
+    if context_secret():
+        authorized = verify_service_request(request.headers.get(SERVICE_SIGNATURE_HEADER), request.get_data())
+    else:
+        authorized = request.remote_addr in ('127.0.0.1', '::1')
+    if not authorized:
+        reason = 'invalid signature' if context_secret() else 'TENANT_CONTEXT_SECRET is not set and caller is not localhost'
+        print(f"⚠️ Refused usage batch from {request.remote_addr}: {reason}")
+        return jsonify({'error': 'Neovlašten servis'}), 401
+    data = request.get_json(silent=True) or {}
+    events = data.get('events')
+    if not isinstance(events, list):
+        return jsonify({'error': 'Nedostaje lista events'}), 400
+    try:
+        saved = tenant_service.save_api_usage([event for event in events if isinstance(event, dict)])
+        return jsonify({'status': 'success', 'saved': saved, 'rejected': len(events) - saved})
+    except Exception as e:
+        print(f"Error saving API usage: {e}")
+        return jsonify({'error': 'Server error'}), 500
+
 @app.route('/health')
 def health():
     return jsonify({
@@ -551,4 +625,6 @@ def health():
 if __name__ == "__main__":
     print("🚀 Pokretanje Tenant Management servisa na portu 5004...")
     print("📝 CORS podešen za portove: 3000, 5000, 5005")
+    if not context_secret():
+        print("⚠️ TENANT_CONTEXT_SECRET nije postavljen: /api/usage/batch prima samo zahtjeve sa localhost-a")
     app.run(host='0.0.0.0', port=5004, debug=True)
\ No newline at end of file
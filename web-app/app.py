@@ -299,6 +299,7 @@ def index():
         <script>
             let API_KEY = null;
             let trenutniKlijenti = [];
+            let sljedeciKursorKlijenata = null;
             const KATEGORIJE = [
                 { id: 'materijal', naziv: 'Troškovi materijala i sirovina' },
                 { id: 'usluga', naziv: 'Troškovi usluga od vanjskih dobavljača' },
@@ -364,6 +365,9 @@ def index():
                         </div>
                     `;
                 });
+                if (sljedeciKursorKlijenata) {
+                    div.innerHTML += '<button onclick="ucitajJosKlijenata()">Učitaj još</button>';
+                }
                 const select = document.getElementById('klijentSelect');
                 select.innerHTML = '<option value="">Izaberi klijenta...</option>';
                 trenutniKlijenti.forEach(k => {
@@ -386,8 +390,8 @@ def index():
                     ucitajStatistike();
                 }
             }
-            function ucitajKlijente() {
-                fetch('http://localhost:5001/api/klijenti', {
+            function ucitajKlijente(cursor) {
+                fetch('http://localhost:5001/api/klijenti' + (cursor ? `?cursor=${encodeURIComponent(cursor)}` : ''), {
                     headers: {
                         'X-Tenant-API-Key': API_KEY
                     }
@@ -396,10 +400,12 @@ def index():
                     if (!r.ok) {
                         throw new Error(`HTTP error! Status: ${r.status}, ${r.statusText}`);
                     }
-                    return r.json();
+                    const sljedeci = r.headers.get('X-Next-Cursor');
+                    return r.json().then(data => ({ data, sljedeci }));
                 })
-                .then(data => {
-                    trenutniKlijenti = data;
+                .then(({ data, sljedeci }) => {
+                    trenutniKlijenti = cursor ? trenutniKlijenti.concat(data) : data;
+                    sljedeciKursorKlijenata = sljedeci;
                     renderKlijenti();
                 })
                 .catch(error => {
@@ -407,6 +413,11 @@ def index():
                     document.getElementById('klijentiLista').innerHTML = `<p>Greška pri učitavanju klijenata: ${error.message}</p>`;
                 });
             }
+            function ucitajJosKlijenata() {
+                if (sljedeciKursorKlijenata) {
+                    ucitajKlijente(sljedeciKursorKlijenata);
+                }
+            }
             document.getElementById('klijentForm').onsubmit = function(e) {
                 e.preventDefault();
                 const data = {